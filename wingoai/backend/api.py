@@ -1,13 +1,21 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, File, UploadFile, Form, Header, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .database import get_db, init_db
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .broadcast_bus import BroadcastSubscriber
+from .database import close_db, get_session, init_db
+from .metrics import pipeline_latency
+from .prediction_cache import prediction_cache
+from .uploads import MAX_SCREENSHOT_BYTES, MAX_SCREENSHOT_MB, UploadTooLarge, save_screenshot
+from .write_behind import write_behind
 from .models import User, VerifyRequest, Prediction, Setting
 from .scheduler import PredictionScheduler
 from .ml_engine import MLEngine, GAME_TYPE_CONFIG
 import os
-import shutil
 from datetime import datetime
-from typing import List
+from typing import Annotated, List, Optional
 import asyncio
 import json
 
@@ -22,6 +30,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Room for the form fields and multipart framing around the screenshot itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request, call_next):
+    """Refuse an oversized upload from its Content-Length, before the form parser spools the body"""
+    if request.method == "POST" and request.url.path == "/verify-request":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and \
+                int(content_length) > MAX_SCREENSHOT_BYTES + UPLOAD_OVERHEAD_BYTES:
+            return JSONResponse({"detail": f"Screenshot larger than {MAX_SCREENSHOT_MB} MB"}, status_code=413)
+    return await call_next(request)
+
 # WebSocket manager
 class ConnectionManager:
     def __init__(self):
@@ -35,28 +56,72 @@ class ConnectionManager:
         self.active_connections.remove(websocket)
 
     async def broadcast_prediction(self, prediction_data):
-        for connection in self.active_connections:
+        for connection in list(self.active_connections):
             try:
                 await connection.send_text(json.dumps(prediction_data))
             except Exception as e:
                 print(f"Error broadcasting to client: {e}")
                 self.active_connections.remove(connection)
 
+MAX_BATCH_PREDICTIONS = 20000
+BATCH_CONTEXT_DRAWS = 100
+DEFAULT_ADMIN_PAGE = 50
+MAX_ADMIN_PAGE = 500
+
+# Run the prediction scheduler inside this process (single API worker only), or set to 0 and
+# run `python -m backend.worker` so any number of API workers just serve reads and relay broadcasts
+EMBEDDED_SCHEDULER = os.getenv("EMBEDDED_SCHEDULER", "1") == "1"
+
 manager = ConnectionManager()
 scheduler = None
+relay = None
+relayed_latency = {}
 ml_engine = MLEngine()
 
+async def relay_latency(summary):
+    global relayed_latency
+    relayed_latency = summary
+
+async def relay_prediction(prediction_data):
+    """A prediction committed by the worker: update the read cache, then push it to clients"""
+    prediction_cache.put(prediction_data)
+    await manager.broadcast_prediction(prediction_data)
+
+async def reload_prediction_cache():
+    # Predictions published while the relay was down are only in the database
+    await run_in_threadpool(prediction_cache.load)
+
+def cached_response(content, etag, max_age, if_none_match):
+    """JSON response with validators; 304 when the client already has this version"""
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content, headers=headers)
+
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     init_db()
-    global scheduler
-    scheduler = PredictionScheduler(manager)
-    scheduler.start()
+    prediction_cache.load()
+    global scheduler, relay
+    if EMBEDDED_SCHEDULER:
+        # Started inside the running loop so scheduled jobs share it with the WebSocket connections
+        scheduler = PredictionScheduler(manager)
+        scheduler.start()
+    else:
+        relay = BroadcastSubscriber(
+            {'prediction': relay_prediction, 'latency': relay_latency},
+            on_connect=reload_prediction_cache
+        )
+        relay.start()
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     if scheduler:
         scheduler.shutdown()
+    if relay:
+        await relay.stop()
+    write_behind.flush()
+    await close_db()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -73,23 +138,18 @@ async def websocket_endpoint(websocket: WebSocket):
 async def create_verify_request(
     tg_id: str = Form(...),
     uid: str = Form(...),
-    screenshot: UploadFile = File(...)
+    screenshot: UploadFile = File(...),
+    db: AsyncSession = Depends(get_session)
 ):
     # Save screenshot
-    uploads_dir = "uploads"
-    os.makedirs(uploads_dir, exist_ok=True)
-    
-    file_extension = screenshot.filename.split(".")[-1]
-    filename = f"{tg_id}_{int(datetime.utcnow().timestamp())}.{file_extension}"
-    file_path = os.path.join(uploads_dir, filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(screenshot.file, buffer)
+    try:
+        file_path = await save_screenshot(screenshot)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    db = get_db()
     try:
         # Check if user exists
-        user = db.query(User).filter(User.tg_id == tg_id).first()
+        user = (await db.execute(select(User).where(User.tg_id == tg_id))).scalars().first()
         if not user:
             user = User(tg_id=tg_id, uid=uid, verified=False)
             db.add(user)
@@ -104,26 +164,24 @@ async def create_verify_request(
             status="pending"
         )
         db.add(verify_request)
-        db.commit()
+        await db.commit()
         
         # Notify admin bot (this would be handled by the admin bot system)
         print(f"Verification request created for TG ID: {tg_id}")
         
         return {"message": "Verification request submitted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 @app.post("/admin/verify")
-async def verify_request(request_id: int, action: str, admin_note: str = ""):
+async def verify_request(request_id: int, action: str, admin_note: str = "",
+                         db: AsyncSession = Depends(get_session)):
     if action not in ["approve", "reject"]:
         raise HTTPException(status_code=400, detail="Action must be approve or reject")
     
-    db = get_db()
     try:
-        verify_request = db.query(VerifyRequest).filter(VerifyRequest.id == request_id).first()
+        verify_request = await db.get(VerifyRequest, request_id)
         if not verify_request:
             raise HTTPException(status_code=404, detail="Request not found")
         
@@ -132,195 +190,216 @@ async def verify_request(request_id: int, action: str, admin_note: str = ""):
         
         if action == "approve":
             # Update user status
-            user = db.query(User).filter(User.tg_id == verify_request.tg_id).first()
+            user = (await db.execute(select(User).where(User.tg_id == verify_request.tg_id))).scalars().first()
             if user:
                 user.verified = True
                 user.verified_at = datetime.utcnow()
         
-        db.commit()
+        await db.commit()
         
         # In a real implementation, this would notify the user bot
         print(f"Request {request_id} {action}d")
         
         return {"message": f"Request {action}d successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
 
 @app.get("/user/status/{tg_id}")
-async def get_user_status(tg_id: str):
-    db = get_db()
-    try:
-        user = db.query(User).filter(User.tg_id == tg_id).first()
-        if not user:
-            return {"status": "not_registered"}
-        
-        return {
-            "status": "verified" if user.verified else "not_verified",
-            "verified": user.verified
-        }
-    finally:
-        db.close()
+async def get_user_status(tg_id: str, db: AsyncSession = Depends(get_session)):
+    user = (await db.execute(select(User).where(User.tg_id == tg_id))).scalars().first()
+    if not user:
+        return {"status": "not_registered"}
+    
+    return {
+        "status": "verified" if user.verified else "not_verified",
+        "verified": user.verified
+    }
 
 @app.get("/predict/{game_type}")
-async def get_latest_prediction(game_type: str):
+async def get_latest_prediction(game_type: str, if_none_match: Annotated[Optional[str], Header()] = None):
     if game_type not in GAME_TYPE_CONFIG:
         raise HTTPException(status_code=400, detail="Invalid game type. Use: 30sec, 1min, 3min, 5min")
     
-    db = get_db()
-    try:
-        prediction = db.query(Prediction).filter(
-            Prediction.game_type == game_type
-        ).order_by(Prediction.created_at.desc()).first()
-        
-        if not prediction:
-            return {"message": f"No {game_type} predictions available"}
-        
-        return {
-            "game_type": prediction.game_type,
-            "period": prediction.period,
-            "color": prediction.color,
-            "confidence": prediction.confidence,
-            "safe": prediction.safe,
-            "model": prediction.model,
-            "timestamp": prediction.created_at.isoformat()
-        }
-    finally:
-        db.close()
+    # Served from the write-through cache; the database is only read on startup
+    prediction, etag = prediction_cache.get(game_type)
+    if not prediction:
+        return {"message": f"No {game_type} predictions available"}
+    
+    return cached_response(prediction, etag, prediction_cache.max_age(game_type), if_none_match)
 
 @app.get("/predict")  # Default endpoint returns all game types
-async def get_all_predictions():
-    db = get_db()
-    try:
-        predictions = {}
-        for game_type in GAME_TYPE_CONFIG.keys():
-            pred = db.query(Prediction).filter(
-                Prediction.game_type == game_type
-            ).order_by(Prediction.created_at.desc()).first()
-            
-            if pred:
-                predictions[game_type] = {
-                    "period": pred.period,
-                    "color": pred.color,
-                    "confidence": pred.confidence,
-                    "safe": pred.safe,
-                    "model": pred.model,
-                    "timestamp": pred.created_at.isoformat()
-                }
-            else:
-                predictions[game_type] = {"message": f"No {game_type} predictions available"}
-        
-        return predictions
-    finally:
-        db.close()
+async def get_all_predictions(if_none_match: Annotated[Optional[str], Header()] = None):
+    predictions = {}
+    etags = []
+    for game_type in GAME_TYPE_CONFIG.keys():
+        pred, etag = prediction_cache.get(game_type)
+        if pred:
+            predictions[game_type] = {key: value for key, value in pred.items() if key != "game_type"}
+            etags.append(etag.strip('"'))
+        else:
+            predictions[game_type] = {"message": f"No {game_type} predictions available"}
+            etags.append("-")
+    
+    # Changes whenever any game type's prediction does; fresh until the soonest next prediction
+    etag = '"' + ".".join(etags) + '"'
+    max_age = min(prediction_cache.max_age(game_type) for game_type in GAME_TYPE_CONFIG)
+    return cached_response(predictions, etag, max_age, if_none_match)
 
 @app.get("/admin/predictions/{game_type}")
-async def get_predictions_by_game(game_type: str, limit: int = 20):
+async def get_predictions_by_game(game_type: str, limit: int = 20, include_skipped: bool = False,
+                                  db: AsyncSession = Depends(get_session)):
     if game_type not in GAME_TYPE_CONFIG:
         raise HTTPException(status_code=400, detail="Invalid game type")
     
-    db = get_db()
-    try:
-        predictions = db.query(Prediction).filter(
-            Prediction.game_type == game_type
-        ).order_by(Prediction.created_at.desc()).limit(limit).all()
-        
-        return [
-            {
-                "game_type": p.game_type,
-                "period": p.period,
-                "color": p.color,
-                "confidence": p.confidence,
-                "safe": p.safe,
-                "model": p.model,
-                "timestamp": p.created_at.isoformat()
-            }
-            for p in predictions
-        ]
-    finally:
-        db.close()
+    query = select(Prediction).where(Prediction.game_type == game_type)
+    if not include_skipped:
+        # Markers for periods that passed without a prediction; the webapp shows this list to users
+        query = query.where(Prediction.skipped.isnot(True))
+    predictions = (await db.execute(
+        query.order_by(Prediction.created_at.desc()).limit(limit)
+    )).scalars().all()
+    
+    return [
+        {
+            "game_type": p.game_type,
+            "period": p.period,
+            "color": p.color,
+            "confidence": p.confidence,
+            "safe": p.safe,
+            "model": p.model,
+            "lead_seconds": p.lead_seconds,
+            "skipped": bool(p.skipped),
+            "timestamp": p.created_at.isoformat()
+        }
+        for p in predictions
+    ]
 
 @app.get("/admin/predictions")
-async def get_all_predictions_admin(limit: int = 10):
-    db = get_db()
-    try:
-        predictions = db.query(Prediction).order_by(
-            Prediction.created_at.desc()
-        ).limit(limit).all()
-        
-        return [
-            {
-                "game_type": p.game_type,
-                "period": p.period,
-                "color": p.color,
-                "confidence": p.confidence,
-                "safe": p.safe,
-                "model": p.model,
-                "timestamp": p.created_at.isoformat()
-            }
-            for p in predictions
-        ]
-    finally:
-        db.close()
+async def get_all_predictions_admin(limit: int = 10, include_skipped: bool = False,
+                                    db: AsyncSession = Depends(get_session)):
+    query = select(Prediction)
+    if not include_skipped:
+        query = query.where(Prediction.skipped.isnot(True))
+    predictions = (await db.execute(
+        query.order_by(Prediction.created_at.desc()).limit(limit)
+    )).scalars().all()
+    
+    return [
+        {
+            "game_type": p.game_type,
+            "period": p.period,
+            "color": p.color,
+            "confidence": p.confidence,
+            "safe": p.safe,
+            "model": p.model,
+            "lead_seconds": p.lead_seconds,
+            "skipped": bool(p.skipped),
+            "timestamp": p.created_at.isoformat()
+        }
+        for p in predictions
+    ]
+
+@app.get("/admin/predict-batch/{game_type}")
+def predict_batch(game_type: str, start_issue: str = None, end_issue: str = None, limit: int = 2880):
+    """Score a range of stored draws in one model call (a day of 30sec periods by default)"""
+    if game_type not in GAME_TYPE_CONFIG:
+        raise HTTPException(status_code=400, detail="Invalid game type")
+    limit = max(1, min(limit, MAX_BATCH_PREDICTIONS))
+    
+    store = ml_engine.history_store
+    history = store.get_history(game_type, limit=limit, start_issue=start_issue, end_issue=end_issue)
+    if not history:
+        return {"game_type": game_type, "predictions": []}
+    
+    # Earlier draws give the first rows in the range full feature windows
+    first_issue = history[-1]["issueNumber"]
+    context = store.get_history(game_type, limit=BATCH_CONTEXT_DRAWS + 1, end_issue=first_issue)
+    
+    predictions = ml_engine.predict_batch(game_type, history + context[1:], start_issue=first_issue)
+    if predictions is None:
+        raise HTTPException(status_code=404, detail=f"No {game_type} model trained yet")
+    
+    return {"game_type": game_type, "predictions": predictions}
+
+@app.get("/admin/metrics/latency")
+async def get_pipeline_latency():
+    """Recent per-stage prediction pipeline latency (ms percentiles) and dropped-tick counts"""
+    # Measured where the scheduler runs; relayed from the worker when it runs separately
+    return pipeline_latency.summary() if scheduler else relayed_latency
+
+def page(query, model, cursor, limit, created_after, created_before):
+    """Keyset page, newest first: rows with id below the cursor, one extra to tell if more follow"""
+    if cursor is not None:
+        query = query.where(model.id < cursor)
+    if created_after is not None:
+        query = query.where(model.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(model.created_at < created_before)
+    return query.order_by(model.id.desc()).limit(limit + 1)
+
+def page_response(rows, limit, serialize):
+    items = rows[:limit]
+    return {
+        "items": [serialize(row) for row in items],
+        # Pass back as ?cursor= for the next (older) page; None on the last page
+        "next_cursor": items[-1].id if len(rows) > limit else None
+    }
 
 @app.get("/admin/users")
-async def get_users():
-    db = get_db()
-    try:
-        users = db.query(User).all()
-        
-        return [
-            {
-                "id": u.id,
-                "tg_id": u.tg_id,
-                "uid": u.uid,
-                "verified": u.verified,
-                "created_at": u.created_at.isoformat() if u.created_at else None,
-                "verified_at": u.verified_at.isoformat() if u.verified_at else None
-            }
-            for u in users
-        ]
-    finally:
-        db.close()
+async def get_users(verified: Optional[bool] = None, created_after: Optional[datetime] = None,
+                    created_before: Optional[datetime] = None, cursor: Optional[int] = None,
+                    limit: int = DEFAULT_ADMIN_PAGE, db: AsyncSession = Depends(get_session)):
+    limit = max(1, min(limit, MAX_ADMIN_PAGE))
+    query = select(User)
+    if verified is not None:
+        query = query.where(User.verified == verified)
+    users = (await db.execute(page(query, User, cursor, limit, created_after, created_before))).scalars().all()
+    
+    return page_response(users, limit, lambda u: {
+        "id": u.id,
+        "tg_id": u.tg_id,
+        "uid": u.uid,
+        "verified": u.verified,
+        "created_at": u.created_at.isoformat() if u.created_at else None,
+        "verified_at": u.verified_at.isoformat() if u.verified_at else None
+    })
 
 @app.get("/admin/verify-requests")
-async def get_verify_requests():
-    db = get_db()
-    try:
-        requests = db.query(VerifyRequest).order_by(
-            VerifyRequest.created_at.desc()
-        ).all()
-        
-        return [
-            {
-                "id": r.id,
-                "tg_id": r.tg_id,
-                "uid_submitted": r.uid_submitted,
-                "screenshot_path": r.screenshot_path,
-                "status": r.status,
-                "admin_note": r.admin_note,
-                "created_at": r.created_at.isoformat()
-            }
-            for r in requests
-        ]
-    finally:
-        db.close()
+async def get_verify_requests(status: Optional[str] = None, created_after: Optional[datetime] = None,
+                              created_before: Optional[datetime] = None, cursor: Optional[int] = None,
+                              limit: int = DEFAULT_ADMIN_PAGE, db: AsyncSession = Depends(get_session)):
+    limit = max(1, min(limit, MAX_ADMIN_PAGE))
+    query = select(VerifyRequest)
+    if status is not None:
+        query = query.where(VerifyRequest.status == status)
+    requests = (await db.execute(
+        page(query, VerifyRequest, cursor, limit, created_after, created_before)
+    )).scalars().all()
+    
+    return page_response(requests, limit, lambda r: {
+        "id": r.id,
+        "tg_id": r.tg_id,
+        "uid_submitted": r.uid_submitted,
+        "screenshot_path": r.screenshot_path,
+        "status": r.status,
+        "admin_note": r.admin_note,
+        "created_at": r.created_at.isoformat()
+    })
 
 # New endpoints for game-specific predictions
 @app.get("/predict/30sec")
-async def get_30sec_prediction():
-    return await get_latest_prediction("30sec")
+async def get_30sec_prediction(if_none_match: Annotated[Optional[str], Header()] = None):
+    return await get_latest_prediction("30sec", if_none_match)
 
 @app.get("/predict/1min")
-async def get_1min_prediction():
-    return await get_latest_prediction("1min")
+async def get_1min_prediction(if_none_match: Annotated[Optional[str], Header()] = None):
+    return await get_latest_prediction("1min", if_none_match)
 
 @app.get("/predict/3min")
-async def get_3min_prediction():
-    return await get_latest_prediction("3min")
+async def get_3min_prediction(if_none_match: Annotated[Optional[str], Header()] = None):
+    return await get_latest_prediction("3min", if_none_match)
 
 @app.get("/predict/5min")
-async def get_5min_prediction():
-    return await get_latest_prediction("5min")
\ No newline at end of file
+async def get_5min_prediction(if_none_match: Annotated[Optional[str], Header()] = None):
+    return await get_latest_prediction("5min", if_none_match)
\ No newline at end of file
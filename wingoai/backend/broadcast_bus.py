@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+
+# Local channel from the prediction worker to the API processes
+BROADCAST_BUS_HOST = os.getenv("BROADCAST_BUS_HOST", "127.0.0.1")
+BROADCAST_BUS_PORT = int(os.getenv("BROADCAST_BUS_PORT", "8765"))
+
+# A subscriber that cannot take a message this fast is dropped; it reconnects on its own
+SEND_TIMEOUT_SECONDS = 2.0
+RECONNECT_SECONDS = 2.0
+
+class BroadcastPublisher:
+    """Worker side: fans line-delimited JSON messages out to every connected API process"""
+
+    def __init__(self, host=BROADCAST_BUS_HOST, port=BROADCAST_BUS_PORT):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.writers = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._on_connect, self.host, self.port)
+        print(f"Broadcast bus listening on {self.host}:{self.port}")
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for writer in list(self.writers):
+            writer.close()
+        self.writers.clear()
+
+    async def _on_connect(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            await reader.read()  # Subscribers never send; EOF means they went away
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def publish(self, message_type, data):
+        line = (json.dumps({"type": message_type, "data": data}) + "\n").encode()
+        for writer in list(self.writers):
+            try:
+                writer.write(line)
+                await asyncio.wait_for(writer.drain(), SEND_TIMEOUT_SECONDS)
+            except Exception as e:
+                print(f"Dropping broadcast subscriber: {e}")
+                self.writers.discard(writer)
+                writer.close()
+
+    async def broadcast_prediction(self, prediction_data):
+        """Same interface as the API's ConnectionManager, so the scheduler can publish through either"""
+        await self.publish('prediction', prediction_data)
+
+class BroadcastSubscriber:
+    """API side: relays the worker's messages to handlers, reconnecting whenever the worker restarts"""
+
+    def __init__(self, handlers, host=BROADCAST_BUS_HOST, port=BROADCAST_BUS_PORT, on_connect=None):
+        self.handlers = handlers  # message type -> async callable(data)
+        self.on_connect = on_connect  # Awaited after every (re)connect, to catch up on missed messages
+        self.host = host
+        self.port = port
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(RECONNECT_SECONDS)
+                continue
+
+            print(f"Relaying broadcasts from {self.host}:{self.port}")
+            try:
+                if self.on_connect:
+                    await self.on_connect()
+                async for line in reader:
+                    message = json.loads(line)
+                    handler = self.handlers.get(message.get('type'))
+                    if handler:
+                        await handler(message['data'])
+            except (OSError, ValueError) as e:
+                print(f"Broadcast bus error: {e}")
+            finally:
+                writer.close()
+            await asyncio.sleep(RECONNECT_SECONDS)
@@ -0,0 +1,23 @@
+# Game type mappings; lead_seconds is how long before a period closes its prediction is published
+GAME_TYPE_CONFIG = {
+    '30sec': {
+        'api_endpoint': 'WinGo_30S',
+        'interval_seconds': 30,
+        'lead_seconds': 20
+    },
+    '1min': {
+        'api_endpoint': 'WinGo_1M',
+        'interval_seconds': 60,
+        'lead_seconds': 45
+    },
+    '3min': {
+        'api_endpoint': 'WinGo_3M',
+        'interval_seconds': 180,
+        'lead_seconds': 160
+    },
+    '5min': {
+        'api_endpoint': 'WinGo_5M',
+        'interval_seconds': 300,
+        'lead_seconds': 280
+    }
+}
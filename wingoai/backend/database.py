@@ -1,20 +1,105 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .models import Base
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./wongo_ai.db")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool per engine (and per process); the overflow connections are closed when returned
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite connection settings; page cache is per connection, so it multiplies by the pool size
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# The same database through an async driver, for the API's request handlers
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def async_database_url(url):
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+def pool_options(url, poolclass=None):
+    if ":memory:" in url:
+        return {}  # One shared connection; there is nothing to size
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    if poolclass:
+        options["poolclass"] = poolclass
+    return options
+
+# Blocking sessions: scheduler jobs, the worker and scripts, which run off the event loop
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = async_database_url(DATABASE_URL)
+# Explicit pool class: aiosqlite defaults to opening (and starting a thread for) a connection per session
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: readers keep seeing the last commit while a write is in progress, instead of waiting on it
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Durable at checkpoints rather than every commit; a power cut can lose only the latest commits
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    # Writers queue for the lock instead of failing with "database is locked"
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrate_db()
+
+def migrate_db():
+    """Add columns and indexes introduced after a table was first created; create_all never alters tables"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    print(f"Added column {table.name}.{column.name}")
+            
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    # Builds over the existing rows once; can take a while on a large table
+                    index.create(bind=conn, checkfirst=True)
+                    print(f"Created index {index.name}")
 
 def get_db():
-    db = SessionLocal()
-    try:
-        return db
-    finally:
-        db.close()
\ No newline at end of file
+    """A blocking session; the caller closes it"""
+    return SessionLocal()
+
+async def get_session():
+    """Request-scoped async session for FastAPI's Depends; returned to the pool after the response"""
+    async with AsyncSessionLocal() as session:
+        yield session
+
+async def close_db():
+    await async_engine.dispose()
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .config import GAME_TYPE_CONFIG
+import os
+import requests
+import threading
+
+# Point at backend/draw_stub.py (e.g. http://127.0.0.1:8100) for offline runs
+DRAW_API_BASE_URL = os.getenv("DRAW_API_BASE_URL", "https://draw.ar-lottery01.com")
+FETCH_CONCURRENCY = int(os.getenv("DRAW_FETCH_CONCURRENCY", "8"))
+FETCH_RETRIES = int(os.getenv("DRAW_FETCH_RETRIES", "3"))
+FETCH_BACKOFF = float(os.getenv("DRAW_FETCH_BACKOFF", "0.5"))
+FETCH_TIMEOUT = float(os.getenv("DRAW_FETCH_TIMEOUT", "10"))
+
+class DrawClient:
+    """Pooled, concurrent client for the GetHistoryIssuePage.json endpoints"""
+
+    def __init__(self, base_url=DRAW_API_BASE_URL, concurrency=FETCH_CONCURRENCY,
+                 retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, timeout=FETCH_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"]
+        )
+        adapter = HTTPAdapter(
+            pool_connections=len(GAME_TYPE_CONFIG),
+            pool_maxsize=self.concurrency,
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def page_url(self, game_type, page):
+        endpoint = GAME_TYPE_CONFIG[game_type]['api_endpoint']
+        return f"{self.base_url}/WinGo/{endpoint}/GetHistoryIssuePage.json?pageNo={page}"
+
+    def fetch_page(self, game_type, page):
+        """Fetch a single history page; raises on network errors"""
+        response = self.session.get(self.page_url(game_type, page), timeout=self.timeout)
+        if response.status_code == 200:
+            data = response.json()
+            if 'data' in data and 'list' in data['data']:
+                return data['data']['list']
+        return []
+
+    def _fetch_page_safe(self, game_type, page):
+        try:
+            return self.fetch_page(game_type, page)
+        except Exception as e:
+            print(f"Error fetching {game_type} page {page}: {e}")
+            return []
+
+    def fetch_pages(self, game_type, pages):
+        """Fetch pages 1..pages concurrently; returns draws newest first, deduplicated by issueNumber"""
+        if game_type not in GAME_TYPE_CONFIG:
+            raise ValueError(f"Invalid game type: {game_type}")
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, pages)) as executor:
+            results = executor.map(lambda page: self._fetch_page_safe(game_type, page), range(1, pages + 1))
+
+            merged = {}
+            for records in results:
+                for record in records:
+                    issue = str(record.get('issueNumber', ''))
+                    if issue and issue not in merged:
+                        merged[issue] = record
+
+        return [merged[issue] for issue in sorted(merged, reverse=True)]
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_draw_client():
+    """Return the process-wide client so connections are pooled across callers"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DrawClient()
+        return _client
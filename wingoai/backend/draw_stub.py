@@ -0,0 +1,151 @@
+"""Local stand-in for the WinGo draw API, for offline benchmarking and load tests.
+
+Serve synthetic draws:
+    python -m backend.draw_stub serve --port 8100 --speed 10 --latency-ms 50 --error-rate 0.05
+
+Record upstream pages once, then replay them:
+    python -m backend.draw_stub record --out fixtures --pages 50
+    python -m backend.draw_stub serve --fixtures fixtures
+
+Point the backend at it with DRAW_API_BASE_URL=http://127.0.0.1:8100.
+"""
+from fastapi import FastAPI, HTTPException
+from .config import GAME_TYPE_CONFIG
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from ml.synthetic import synthetic_draw
+
+class DrawSource:
+    """Chronological draws for one endpoint, revealed over time at a configurable rate"""
+
+    def __init__(self, endpoint, interval_seconds, initial=1000, speed=1.0, fixtures=None, seed=0):
+        self.endpoint = endpoint
+        self.interval_seconds = interval_seconds
+        self.initial = initial
+        self.speed = speed
+        self.fixtures = fixtures  # Oldest first when replaying recorded draws
+        self.seed = seed
+        self.started = time.monotonic()
+
+    def available(self):
+        """Number of draws published so far"""
+        elapsed = time.monotonic() - self.started
+        produced = int(elapsed * self.speed / self.interval_seconds) if self.speed > 0 else 0
+        count = self.initial + produced
+        if self.fixtures is not None:
+            count = min(count, len(self.fixtures))
+        return count
+
+    def draw(self, index):
+        if self.fixtures is not None:
+            return self.fixtures[index]
+        return synthetic_draw(self.endpoint, self.interval_seconds, index, self.seed)
+
+    def page(self, page_no, page_size):
+        """Records for a page, newest first like the real API"""
+        newest = self.available() - 1 - (page_no - 1) * page_size
+        oldest = max(newest - page_size + 1, 0)
+        return [self.draw(index) for index in range(newest, oldest - 1, -1)]
+
+def load_fixtures(fixtures_dir, endpoint):
+    path = os.path.join(fixtures_dir, f"{endpoint}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        records = json.load(f)
+    return sorted(records, key=lambda r: str(r['issueNumber']))
+
+def create_app(initial=1000, speed=1.0, fixtures_dir=None, seed=0, latency_ms=0.0,
+               latency_jitter_ms=0.0, error_rate=0.0, page_size=10, page_size_jitter=0):
+    """Build the stand-in app; latency, errors and page size are injected per request"""
+    app = FastAPI(title="WinGo Draw API Stand-in")
+    rng = random.Random(seed)
+    sources = {}
+    for config in GAME_TYPE_CONFIG.values():
+        endpoint = config['api_endpoint']
+        fixtures = load_fixtures(fixtures_dir, endpoint) if fixtures_dir else None
+        sources[endpoint] = DrawSource(endpoint, config['interval_seconds'], initial, speed, fixtures, seed)
+
+    @app.get("/WinGo/{endpoint}/GetHistoryIssuePage.json")
+    async def get_history_issue_page(endpoint: str, pageNo: int = 1):
+        if endpoint not in sources:
+            raise HTTPException(status_code=404, detail="Unknown endpoint")
+
+        delay = latency_ms + rng.uniform(-latency_jitter_ms, latency_jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if rng.random() < error_rate:
+            raise HTTPException(status_code=503, detail="Injected error")
+
+        size = max(1, page_size + rng.randint(-page_size_jitter, page_size_jitter))
+        source = sources[endpoint]
+        return {
+            "data": {
+                "list": source.page(max(pageNo, 1), size),
+                "pageNo": pageNo,
+                "totalCount": source.available()
+            },
+            "code": 0,
+            "msg": "Succeed"
+        }
+
+    return app
+
+def record(out_dir, pages):
+    """Save upstream pages per endpoint as replayable fixtures"""
+    from .draw_client import DrawClient
+
+    os.makedirs(out_dir, exist_ok=True)
+    client = DrawClient()
+    for game_type, config in GAME_TYPE_CONFIG.items():
+        records = client.fetch_pages(game_type, pages)
+        with open(os.path.join(out_dir, f"{config['api_endpoint']}.json"), "w") as f:
+            json.dump(records, f)
+        print(f"Recorded {len(records)} {game_type} draws")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Serve GetHistoryIssuePage.json for all game types")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8100)
+    serve.add_argument("--fixtures", help="Replay recorded draws from this directory")
+    serve.add_argument("--initial", type=int, default=1000, help="Draws available at startup")
+    serve.add_argument("--speed", type=float, default=1.0, help="New draws per real period (0 freezes history)")
+    serve.add_argument("--seed", type=int, default=0)
+    serve.add_argument("--latency-ms", type=float, default=0.0)
+    serve.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    serve.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    serve.add_argument("--page-size", type=int, default=10)
+    serve.add_argument("--page-size-jitter", type=int, default=0)
+
+    rec = commands.add_parser("record", help="Record upstream pages as fixtures")
+    rec.add_argument("--out", default="fixtures")
+    rec.add_argument("--pages", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.out, args.pages)
+        return
+
+    import uvicorn
+    app = create_app(
+        initial=args.initial,
+        speed=args.speed,
+        fixtures_dir=args.fixtures,
+        seed=args.seed,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        page_size=args.page_size,
+        page_size_jitter=args.page_size_jitter
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from .config import GAME_TYPE_CONFIG
+from .database import get_db
+from .draw_client import get_draw_client
+from .models import Draw
+
+class HistoryStore:
+    """Local per-game-type draw history, synced incrementally from the draw API"""
+
+    def __init__(self, client=None):
+        self.client = client or get_draw_client()
+
+    def fetch_page(self, game_type, page):
+        """Fetch a single history page from the draw API"""
+        return self.client.fetch_page(game_type, page)
+
+    def sync(self, game_type, max_pages=50, backfill_to=1):
+        """Pull new draws until an already-stored issue is reached; returns the new draws.
+
+        While fewer than backfill_to draws are stored, all max_pages are pulled instead, so a
+        store that an earlier short poll started still fills in its older history.
+        """
+        if game_type not in GAME_TYPE_CONFIG:
+            raise ValueError(f"Invalid game type: {game_type}")
+
+        if self.count_history(game_type) < backfill_to:
+            # Nothing (or too little) to stop at, so pull every page concurrently
+            fresh, _ = self.store(game_type, self.client.fetch_pages(game_type, max_pages))
+            return fresh
+
+        new_draws = []
+        for page in range(1, max_pages + 1):
+            try:
+                records = self.fetch_page(game_type, page)
+            except Exception as e:
+                print(f"Error fetching {game_type} page {page}: {e}")
+                break
+
+            if not records:
+                break
+
+            fresh, reached_known = self.store(game_type, records)
+            new_draws.extend(fresh)
+            if reached_known:
+                break
+
+        return new_draws
+
+    def store(self, game_type, records):
+        """Insert records not stored yet; returns (new records, whether any were already stored)"""
+        issues = [str(r['issueNumber']) for r in records if 'issueNumber' in r]
+        if not issues:
+            return [], False
+
+        db = get_db()
+        try:
+            known = {
+                row.issue_number for row in db.query(Draw.issue_number).filter(
+                    Draw.game_type == game_type,
+                    Draw.issue_number.in_(issues)
+                )
+            }
+
+            fresh = []
+            for record in records:
+                issue = str(record.get('issueNumber', ''))
+                if not issue or issue in known:
+                    continue
+                known.add(issue)
+                fresh.append(record)
+                db.add(Draw(
+                    game_type=game_type,
+                    issue_number=issue,
+                    number=str(record.get('number')),
+                    color=record.get('color')
+                ))
+            db.commit()
+
+            return fresh, len(fresh) < len(issues)
+        except Exception as e:
+            print(f"Error storing {game_type} draws: {e}")
+            db.rollback()
+            return [], True
+        finally:
+            db.close()
+
+    def count_history(self, game_type):
+        db = get_db()
+        try:
+            return db.query(Draw.id).filter(Draw.game_type == game_type).count()
+        finally:
+            db.close()
+
+    def get_history(self, game_type, limit=None, start_issue=None, end_issue=None):
+        """Return stored draws newest first, in the same shape as the draw API records"""
+        db = get_db()
+        try:
+            query = db.query(Draw).filter(Draw.game_type == game_type)
+            if start_issue:
+                query = query.filter(Draw.issue_number >= str(start_issue))
+            if end_issue:
+                query = query.filter(Draw.issue_number <= str(end_issue))
+            query = query.order_by(Draw.issue_number.desc())
+            if limit:
+                query = query.limit(limit)
+
+            return [
+                {
+                    "issueNumber": d.issue_number,
+                    "number": d.number,
+                    "color": d.color
+                }
+                for d in query.all()
+            ]
+        finally:
+            db.close()
@@ -0,0 +1,69 @@
+from .config import GAME_TYPE_CONFIG
+from .history_store import HistoryStore
+import threading
+
+# Draws per page of the draw API's history endpoint
+DRAWS_PER_PAGE = 10
+
+class DrawIngestor:
+    """Polls one game type and publishes newly stored draws to its subscribers"""
+
+    def __init__(self, game_type, history_store, poll_pages=5):
+        self.game_type = game_type
+        self.history_store = history_store
+        self.poll_pages = poll_pages
+        self.subscribers = []
+        self.lock = threading.Lock()  # One sync per game type at a time
+
+    def subscribe(self, callback):
+        """Register callback(game_type, new_draws); new_draws are newest first"""
+        self.subscribers.append(callback)
+
+    def poll(self, max_pages=None, backfill_to=1):
+        """Sync the store and fan new draws out to subscribers; returns the new draws"""
+        with self.lock:
+            new_draws = self.history_store.sync(
+                self.game_type, max_pages=max_pages or self.poll_pages, backfill_to=backfill_to
+            )
+
+        if new_draws:
+            self.publish(new_draws)
+        return new_draws
+
+    def publish(self, new_draws):
+        for callback in list(self.subscribers):
+            try:
+                callback(self.game_type, new_draws)
+            except Exception as e:
+                print(f"Error in {self.game_type} draw subscriber {getattr(callback, '__name__', callback)}: {e}")
+
+class IngestionService:
+    """The single owner of draw API traffic: one ingestor per game type"""
+
+    def __init__(self, history_store=None, poll_pages=5, bootstrap_pages=50):
+        self.history_store = history_store or HistoryStore()
+        self.bootstrap_pages = bootstrap_pages
+        self.ingestors = {
+            game_type: DrawIngestor(game_type, self.history_store, poll_pages)
+            for game_type in GAME_TYPE_CONFIG
+        }
+
+    def subscribe(self, callback, game_types=None):
+        """Subscribe callback to new draws for the given game types (default: all)"""
+        for game_type in game_types or self.ingestors.keys():
+            self.ingestors[game_type].subscribe(callback)
+
+    def poll(self, game_type):
+        if game_type not in self.ingestors:
+            raise ValueError(f"Invalid game type: {game_type}")
+        return self.ingestors[game_type].poll()
+
+    def bootstrap(self, game_types=None):
+        """Fill the store with up to bootstrap_pages of history per game type"""
+        for game_type in game_types or self.ingestors.keys():
+            # A tick may already have stored the newest pages; keep paging past them until the
+            # store holds what a full bootstrap would
+            new_draws = self.ingestors[game_type].poll(
+                max_pages=self.bootstrap_pages, backfill_to=self.bootstrap_pages * DRAWS_PER_PAGE
+            )
+            print(f"Ingested {len(new_draws)} new {game_type} draws")
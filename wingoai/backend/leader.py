@@ -0,0 +1,88 @@
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from .database import get_db
+from .models import Lease
+from datetime import datetime, timedelta
+import asyncio
+import os
+import socket
+import uuid
+
+# A leader that has not renewed for this long is presumed dead
+LEADER_LEASE_SECONDS = int(os.getenv("LEADER_LEASE_SECONDS", "30"))
+
+class LeaderLease:
+    """A named database-row lease: whoever holds the unexpired row is the leader"""
+
+    def __init__(self, name, ttl=LEADER_LEASE_SECONDS, owner=None):
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self):
+        """Take the lease if it is free or expired, or renew it if already ours; returns whether we hold it"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        db = get_db()
+        try:
+            renewed = db.query(Lease).filter(
+                Lease.name == self.name,
+                or_(Lease.owner == self.owner, Lease.expires_at < now)
+            ).update({Lease.owner: self.owner, Lease.expires_at: expires_at}, synchronize_session=False)
+            if not renewed:
+                # No row yet; the primary key makes concurrent first claims race safely
+                db.add(Lease(name=self.name, owner=self.owner, expires_at=expires_at))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False  # Held by another owner
+        except Exception as e:
+            print(f"Error acquiring {self.name} lease: {e}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def release(self):
+        db = get_db()
+        try:
+            db.query(Lease).filter(Lease.name == self.name, Lease.owner == self.owner).delete()
+            db.commit()
+        except Exception as e:
+            print(f"Error releasing {self.name} lease: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    async def hold(self, on_elected, on_demoted):
+        """Campaign for the lease until cancelled, awaiting on_elected/on_demoted as leadership changes"""
+        loop = asyncio.get_running_loop()
+        leader = False
+        try:
+            while True:
+                acquired = await loop.run_in_executor(None, self.acquire)
+                if acquired and not leader:
+                    leader = True
+                    print(f"Acquired {self.name} lease as {self.owner}")
+                    try:
+                        await on_elected()
+                    except Exception as e:
+                        # E.g. the broadcast port is still bound: step down, free the lease, keep campaigning
+                        print(f"Error taking the {self.name} lease: {e}")
+                        leader = False
+                        try:
+                            await on_demoted()
+                        except Exception as e:
+                            print(f"Error stepping down from the {self.name} lease: {e}")
+                        await loop.run_in_executor(None, self.release)
+                elif not acquired and leader:
+                    leader = False
+                    print(f"Lost {self.name} lease")
+                    await on_demoted()
+                # Renew well within the TTL so one slow round trip does not cost the lease
+                await asyncio.sleep(self.ttl / 3)
+        finally:
+            if leader:
+                await on_demoted()
+                await loop.run_in_executor(None, self.release)
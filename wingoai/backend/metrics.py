@@ -0,0 +1,47 @@
+from collections import deque
+import os
+import threading
+import numpy as np
+
+# Samples kept per game type and stage for the percentiles
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "500"))
+
+class StageLatency:
+    """Recent per-stage durations of the prediction pipeline, by game type"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.samples = {}  # (game_type, stage) -> deque of seconds
+        self.counters = {}  # (game_type, event) -> count, e.g. overruns and skipped ticks
+        self.lock = threading.Lock()
+
+    def record(self, game_type, stage, seconds):
+        with self.lock:
+            self.samples.setdefault((game_type, stage), deque(maxlen=self.window)).append(seconds)
+
+    def count(self, game_type, event):
+        with self.lock:
+            self.counters[(game_type, event)] = self.counters.get((game_type, event), 0) + 1
+
+    def summary(self):
+        """{game_type: {"stages": {stage: percentiles in ms}, "events": {event: count}}}"""
+        with self.lock:
+            samples = {key: list(values) for key, values in self.samples.items()}
+            counters = dict(self.counters)
+
+        result = {}
+        for (game_type, stage), values in samples.items():
+            ms = np.asarray(values) * 1000
+            result.setdefault(game_type, {"stages": {}, "events": {}})["stages"][stage] = {
+                "count": len(ms),
+                "p50": round(float(np.percentile(ms, 50)), 2),
+                "p95": round(float(np.percentile(ms, 95)), 2),
+                "p99": round(float(np.percentile(ms, 99)), 2),
+                "max": round(float(ms.max()), 2)
+            }
+        for (game_type, event), value in counters.items():
+            result.setdefault(game_type, {"stages": {}, "events": {}})["events"][event] = value
+        return result
+
+# Shared by the scheduler that records and the API that reports
+pipeline_latency = StageLatency()
@@ -1,271 +1,273 @@
-import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
-import joblib
-import requests
 import json
+import copy
 import os
+import time
 from datetime import datetime, timedelta
 import warnings
+from .config import GAME_TYPE_CONFIG
+from .history_store import HistoryStore
+from .model_registry import ModelRegistry
+from .periods import next_issue
+from ml.feature_builder import COLOR_NAMES, DrawArrays, build_feature_matrix, build_features, training_rows
+from ml.feature_cache import FeatureCache
+from ml.online_features import OnlineFeatureState
 warnings.filterwarnings('ignore')
 
-# Game type mappings
-GAME_TYPE_CONFIG = {
-    '30sec': {
-        'api_endpoint': 'WinGo_30S',
-        'interval_seconds': 30
-    },
-    '1min': {
-        'api_endpoint': 'WinGo_1M',
-        'interval_seconds': 60
-    },
-    '3min': {
-        'api_endpoint': 'WinGo_3M',
-        'interval_seconds': 180
-    },
-    '5min': {
-        'api_endpoint': 'WinGo_5M',
-        'interval_seconds': 300
-    }
-}
+# Upper bound on stored draws used for a training run
+MAX_TRAINING_RECORDS = int(os.getenv("MAX_TRAINING_RECORDS", "5000"))
+
+# Predictions at or above this confidence are flagged safe to play
+MIN_CONFIDENCE_FOR_SAFE = 0.80
+
+# Incremental (warm-start) updates between full retrains
+INCREMENTAL_EVERY_DRAWS = int(os.getenv("INCREMENTAL_EVERY_DRAWS", "100"))
+INCREMENTAL_WINDOW = int(os.getenv("INCREMENTAL_WINDOW", "500"))
+INCREMENTAL_TREES = int(os.getenv("INCREMENTAL_TREES", "10"))
+INCREMENTAL_MAX_TREES = int(os.getenv("INCREMENTAL_MAX_TREES", "200"))
+
+# Forest settings used until ml.tuner has persisted a tuned set for the game type
+DEFAULT_MODEL_PARAMS = {"n_estimators": 100, "random_state": 42}
 
 class MLEngine:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.label_encoder = LabelEncoder()
+    def __init__(self, n_jobs=1):
+        self.n_jobs = n_jobs  # Cores used to build trees within one fit
         self.models_dir = "ml/models"
+        self.history_store = HistoryStore()
+        self.feature_states = {}  # game_type -> OnlineFeatureState for the live path
         os.makedirs(self.models_dir, exist_ok=True)
+        self.registry = ModelRegistry(self.models_dir)
+        self.training_timings = {}  # game_type -> seconds per stage of the last training run
+        self.feature_cache = FeatureCache(os.path.join(self.models_dir, "features"))
         
-    def fetch_history(self, game_type, pages=50):
-        """Fetch prediction history from API for specific game type"""
+    def hyperparams_path(self, game_type):
+        return os.path.join(self.models_dir, f"hyperparams_{game_type}.json")
+
+    def model_params(self, game_type):
+        """Tuned forest settings for specific game type, falling back to the defaults"""
+        params = dict(DEFAULT_MODEL_PARAMS)
+        try:
+            with open(self.hyperparams_path(game_type)) as f:
+                params.update(json.load(f)["params"])
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as e:
+            print(f"Ignoring unreadable {game_type} hyperparameters: {e}")
+        return params
+
+    def build_model(self, game_type, params=None):
+        """Fresh, unfitted model for specific game type"""
+        params = params if params is not None else self.model_params(game_type)
+        return RandomForestClassifier(**params, n_jobs=self.n_jobs)
+
+    def fetch_history(self, game_type, limit=MAX_TRAINING_RECORDS):
+        """Read history for specific game type from the local draw store"""
         if game_type not in GAME_TYPE_CONFIG:
             raise ValueError(f"Invalid game type: {game_type}")
             
-        endpoint = GAME_TYPE_CONFIG[game_type]['api_endpoint']
-        history = []
-        for page in range(1, pages + 1):
-            try:
-                url = f"https://draw.ar-lottery01.com/WinGo/{endpoint}/GetHistoryIssuePage.json?pageNo={page}"
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'data' in data and 'list' in data['data']:
-                        history.extend(data['data']['list'])
-            except Exception as e:
-                print(f"Error fetching {game_type} page {page}: {e}")
-                continue
-        return history
+        return self.history_store.get_history(game_type, limit=limit)
 
     def prepare_features(self, history_data):
         """Prepare features from history data"""
-        df = pd.DataFrame(history_data)
-        if df.empty:
-            return pd.DataFrame()
-            
-        # Sort by issue number to ensure chronological order
-        df = df.sort_values('issueNumber').reset_index(drop=True)
-        
-        # Convert number to numeric if needed
-        df['number'] = pd.to_numeric(df['number'], errors='coerce')
-        
-        # Feature engineering
-        features = pd.DataFrame()
-        features['issueNumber'] = df['issueNumber']
-        features['number'] = df['number']
-        
-        # Color features
-        features['color_encoded'] = self.label_encoder.fit_transform(df['color'])
-        
-        # Last N outcomes features
-        for i in range(1, 6):  # Last 5 rounds
-            features[f'prev_color_{i}'] = df['color'].shift(i).apply(
-                lambda x: self.label_encoder.transform([x])[0] if x in self.label_encoder.classes_ else -1
-            )
-            features[f'prev_number_{i}'] = df['number'].shift(i)
-        
-        # Streak features
-        features['streak_red'] = self._calculate_streak(df['color'], 'RED')
-        features['streak_green'] = self._calculate_streak(df['color'], 'GREEN')
-        features['streak_violet'] = self._calculate_streak(df['color'], 'VIOLET')
-        
-        # Color frequency in last 10 rounds - FIXED VERSION
-        # Create numeric mapping for colors to use in rolling operations
-        color_map = {'RED': 1, 'GREEN': 2, 'VIOLET': 3}
-        df['color_numeric'] = df['color'].apply(lambda x: color_map.get(x, 0))
-        
-        for color in ['RED', 'GREEN', 'VIOLET']:
-            color_code = color_map[color]
-            features[f'freq_{color}_last10'] = df['color_numeric'].rolling(window=10).apply(
-                lambda x: (x == color_code).sum() if len(x) == 10 else np.nan,
-                raw=True  # Use raw=True for faster numeric operations
-            )
-        
-        # Parity features
-        features['is_even'] = (df['number'] % 2 == 0).astype(int)
-        features['parity_streak'] = self._calculate_parity_streak(df['number'])
-        
-        # Big/small features (assuming >50 is big)
-        features['is_big'] = (df['number'] > 50).astype(int)
-        features['big_streak'] = self._calculate_big_small_streak(df['number'], 'big')
-        
-        # Moving averages
-        features['ma_5'] = df['number'].rolling(window=5).mean()
-        features['ma_10'] = df['number'].rolling(window=10).mean()
-        
-        # Deltas
-        features['delta_1'] = df['number'].diff(1)
-        features['delta_2'] = df['number'].diff(2)
-        
-        # Drop rows with NaN values
-        features = features.dropna()
-        
-        # Prepare target variable (next color)
-        targets = df['color'].iloc[1:].reset_index(drop=True)
-        features = features.iloc[:-1].reset_index(drop=True)
-        
-        return features, targets
-
-    def _calculate_streak(self, series, color):
-        """Calculate consecutive streaks for a specific color"""
-        streaks = []
-        current_streak = 0
-        
-        for val in series:
-            if val == color:
-                current_streak += 1
-            else:
-                current_streak = 0
-            streaks.append(current_streak)
-        
-        return streaks
+        return build_features(history_data)
 
-    def _calculate_parity_streak(self, numbers):
-        """Calculate consecutive parity streaks"""
-        streaks = []
-        current_streak = 0
-        last_parity = None
-        
-        for num in numbers:
-            if pd.isna(num):
-                streaks.append(0)
-                continue
-                
-            parity = 'even' if num % 2 == 0 else 'odd'
-            if parity == last_parity:
-                current_streak += 1
-            else:
-                current_streak = 1
-            last_parity = parity
-            streaks.append(current_streak)
-        
-        return streaks
-
-    def _calculate_big_small_streak(self, numbers, category):
-        """Calculate big/small streaks"""
-        streaks = []
-        current_streak = 0
-        last_category = None
-        
-        for num in numbers:
-            if pd.isna(num):
-                streaks.append(0)
-                continue
-                
-            cat = 'big' if num > 50 else 'small'
-            if cat == last_category:
-                current_streak += 1
-            else:
-                current_streak = 1
-            last_category = cat
-            streaks.append(current_streak)
-        
-        return streaks
-
-    def train_model(self, game_type):
-        """Train the ML model for specific game type"""
-        print(f"Fetching {game_type} history data...")
-        history = self.fetch_history(game_type, pages=50)
+    def train_model(self, game_type, limit=MAX_TRAINING_RECORDS):
+        """Train the ML model for specific game type on the most recent `limit` draws"""
+        timings = {}
+        started = time.perf_counter()
+        print(f"Loading {game_type} history data...")
+        history = self.fetch_history(game_type, limit=limit)
+        timings['load'] = time.perf_counter() - started
         
         if len(history) < 100:
             print(f"Not enough data to train {game_type} model")
             return False
             
-        print(f"Fetched {len(history)} {game_type} records")
+        print(f"Loaded {len(history)} {game_type} records")
         
-        features, targets = self.prepare_features(history)
+        # Features come from the shared registry; only draws new since the last run are computed
+        started = time.perf_counter()
+        draws = DrawArrays.from_history(history)
+        matrix = self.feature_cache.matrix(game_type, draws)
+        rows, y = training_rows(draws, matrix)
+        timings['features'] = time.perf_counter() - started
         
-        if features.empty or len(features) != len(targets):
-            print(f"Not enough features or mismatch in {game_type} data")
+        if len(rows) < 2:
+            print(f"Not enough features in {game_type} data")
             return False
             
-        print(f"{game_type} Features shape: {features.shape}")
-        
-        # Prepare features for training (exclude issueNumber and other non-feature columns)
-        feature_cols = [col for col in features.columns if col not in ['issueNumber']]
-        X = features[feature_cols]
-        y = self.label_encoder.fit_transform(targets)
+        X = matrix[rows]
+        print(f"{game_type} Features shape: {X.shape}")
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
-        # Train model
-        self.model.fit(X_train, y_train)
+        # Train a new model so predictions keep using the current one until it is swapped in
+        started = time.perf_counter()
+        model = self.build_model(game_type)
+        model.fit(X_train, y_train)
+        timings['fit'] = time.perf_counter() - started
         
         # Evaluate
-        train_score = self.model.score(X_train, y_train)
-        test_score = self.model.score(X_test, y_test)
+        train_score = model.score(X_train, y_train)
+        test_score = model.score(X_test, y_test)
         
         print(f"{game_type} Training score: {train_score:.3f}")
         print(f"{game_type} Test score: {test_score:.3f}")
         
-        # Save model with game type suffix
-        joblib.dump(self.model, os.path.join(self.models_dir, f'rf_model_{game_type}.pkl'))
-        joblib.dump(self.label_encoder, os.path.join(self.models_dir, f'label_encoder_{game_type}.pkl'))
+        # Save model with game type suffix and swap it into the registry
+        started = time.perf_counter()
+        self.registry.publish(game_type, model, X_check=X_test)
+        timings['save'] = time.perf_counter() - started
+        self.training_timings[game_type] = timings
         
         return True
 
-    def load_model(self, game_type):
-        """Load trained model for specific game type"""
-        try:
-            model_path = os.path.join(self.models_dir, f'rf_model_{game_type}.pkl')
-            encoder_path = os.path.join(self.models_dir, f'label_encoder_{game_type}.pkl')
-            
-            if os.path.exists(model_path) and os.path.exists(encoder_path):
-                self.model = joblib.load(model_path)
-                self.label_encoder = joblib.load(encoder_path)
-                return True
-            else:
-                return False
-        except Exception as e:
-            print(f"Error loading {game_type} model: {e}")
+    def update_model(self, game_type, window=INCREMENTAL_WINDOW):
+        """Add trees fitted on the most recent draws, retiring the oldest beyond the cap"""
+        base_version = self.registry.estimator_version(game_type)
+        current = self.registry.get_estimator(game_type)
+        if current is None:
+            print(f"No {game_type} model to update; a full training run is needed")
             return False
-
-    def predict_next(self, game_type, history_data):
-        """Predict next outcome for specific game type"""
-        if not self.load_model(game_type):
-            print(f"{game_type} model not found, training new model...")
-            if not self.train_model(game_type):
-                return None, 0.0
         
-        features, _ = self.prepare_features(history_data[-20:])  # Use last 20 rounds for prediction
+        history = self.fetch_history(game_type, limit=window)
+        draws = DrawArrays.from_history(history)
+        matrix = self.feature_cache.matrix(game_type, draws)
+        rows, y = training_rows(draws, matrix)
+        
+        # Warm-started trees must agree with the existing ones on the set of classes
+        if len(rows) < 2 or not np.array_equal(np.unique(y), current.classes_):
+            print(f"Skipping {game_type} incremental update: window does not cover every class")
+            return False
         
-        if features.empty:
+        # Grow a copy so in-flight predictions keep the published forest intact
+        model = copy.copy(current)
+        model.estimators_ = list(current.estimators_)
+        # With a fixed seed, a forest held at the cap would give its new trees the same seeds every update
+        model.set_params(
+            warm_start=True,
+            n_estimators=len(model.estimators_) + INCREMENTAL_TREES,
+            random_state=int(draws.issues[-1]) % 2**32
+        )
+        model.fit(matrix[rows], y)
+        
+        # Bounded ageing: keep only the newest trees
+        if len(model.estimators_) > INCREMENTAL_MAX_TREES:
+            model.estimators_ = model.estimators_[-INCREMENTAL_MAX_TREES:]
+            model.set_params(n_estimators=len(model.estimators_))
+        
+        if self.registry.publish(game_type, model, X_check=matrix[rows], base_version=base_version) is None:
+            # A full retrain published meanwhile; growing its predecessor would undo it
+            print(f"Discarding {game_type} incremental update: the model was retrained meanwhile")
+            return False
+        print(f"{game_type} model updated on {len(rows)} recent rows ({len(model.estimators_)} trees)")
+        return True
+
+    def load_model(self, game_type):
+        """Hot model snapshot for specific game type, or None if it has not been trained"""
+        return self.registry.get(game_type)
+
+    def predict_next(self, game_type, history_data, timings=None):
+        """Predict next outcome for specific game type
+        
+        Returns (None, 0.0) if no model has been trained; training is left to the caller so a
+        prediction tick never pays for it. Stage durations are added to `timings` if given.
+        """
+        loaded = self.load_model(game_type)
+        if loaded is None:
+            print(f"{game_type} model not found")
             return None, 0.0
-            
-        # Prepare features for prediction
-        feature_cols = [col for col in features.columns if col not in ['issueNumber']]
-        X = features[feature_cols].tail(1)  # Last row for prediction
+        model = loaded.model
+        
+        started = time.perf_counter()
+        state = self.update_feature_state(game_type, history_data)
+        row = state.vector()
+        if timings is not None:
+            timings['features'] = time.perf_counter() - started
         
-        if X.empty:
+        if row is None:
             return None, 0.0
             
-        # Make prediction
-        prediction = self.model.predict(X)[0]
-        probabilities = self.model.predict_proba(X)[0]
+        # Single pass over the (compiled) forest: predict is the argmax of predict_proba
+        started = time.perf_counter()
+        probabilities = model.predict_proba(np.array([row], dtype=float))[0]
+        best = int(np.argmax(probabilities))
+        if timings is not None:
+            timings['inference'] = time.perf_counter() - started
         
-        predicted_color = self.label_encoder.inverse_transform([prediction])[0]
-        confidence = max(probabilities)
+        predicted_color = COLOR_NAMES[int(model.classes_[best])]
+        confidence = float(probabilities[best])  # Plain float: it ends up in JSON payloads
         
         return predicted_color, confidence
+
+    def predict_batch(self, game_type, history_data, start_issue=None):
+        """Score every complete window in history with one model call
+        
+        Each result predicts the draw `period`, like stored predictions, from the draws up to and
+        including `after_period`; draws before start_issue only serve as feature context.
+        Returns None if no model has been trained for the game type.
+        """
+        loaded = self.load_model(game_type)
+        if loaded is None:
+            return None
+        model = loaded.model
+        
+        if not len(history_data):
+            return []
+        draws = DrawArrays.from_history(history_data)
+        matrix = build_feature_matrix(draws)
+        
+        rows = np.flatnonzero(~np.isnan(matrix).any(axis=1))
+        if start_issue:
+            rows = rows[draws.issues[rows] >= str(start_issue)]
+        if not len(rows):
+            return []
+        
+        probabilities = model.predict_proba(matrix[rows])
+        best = np.argmax(probabilities, axis=1)
+        confidences = probabilities[np.arange(len(rows)), best]
+        
+        interval = GAME_TYPE_CONFIG[game_type]['interval_seconds']
+        results = []
+        for row, class_index, confidence in zip(rows, best, confidences):
+            results.append({
+                "period": self.following_issue(draws, row, interval),
+                "after_period": str(draws.issues[row]),
+                "color": COLOR_NAMES[int(model.classes_[class_index])],
+                "confidence": float(confidence),
+                "safe": bool(confidence >= MIN_CONFIDENCE_FOR_SAFE),
+                "actual": draws.colors[row + 1] if row + 1 < len(draws) else None
+            })
+        return results
+
+    @staticmethod
+    def following_issue(draws, row, interval_seconds):
+        """Issue of the draw after row: the stored one if present, else the next on the calendar"""
+        if row + 1 < len(draws):
+            return str(draws.issues[row + 1])
+        try:
+            return next_issue(str(draws.issues[row]), interval_seconds)
+        except (TypeError, ValueError):
+            return None  # Unrecognised issue format
+
+    def update_feature_state(self, game_type, history_data):
+        """Advance the online feature state with draws it has not seen (history is newest first)"""
+        state = self.feature_states.get(game_type)
+        
+        new_draws = []
+        for draw in history_data:
+            if state is not None and state.last_issue is not None and str(draw['issueNumber']) <= state.last_issue:
+                break
+            new_draws.append(draw)
+        
+        # Rebuild from the full window on first use or if draws were missed
+        if state is None or len(new_draws) == len(history_data):
+            state = OnlineFeatureState()
+            self.feature_states[game_type] = state
+        
+        for draw in reversed(new_draws):
+            state.update(draw)
+        return state
@@ -0,0 +1,117 @@
+from ml.compiled_forest import CompiledForest
+import joblib
+import os
+import threading
+import time
+
+class LoadedModel:
+    """An immutable snapshot of one game type's model, as handed to a prediction"""
+
+    def __init__(self, game_type, model, version):
+        self.game_type = game_type
+        self.model = model  # CompiledForest, or a scikit-learn forest for older artifacts
+        self.version = version  # (path, mtime_ns, size) of the artifact it was loaded from
+        self.loaded_at = time.time()
+
+class ModelRegistry:
+    """Keeps one hot model per game type, reloading only when its artifact changes"""
+
+    def __init__(self, models_dir):
+        self.models_dir = models_dir
+        self.models = {}
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+
+    def model_path(self, game_type):
+        """Full scikit-learn artifact, kept for warm-start updates"""
+        return os.path.join(self.models_dir, f'rf_model_{game_type}.pkl')
+
+    def compiled_path(self, game_type):
+        """Flattened inference artifact served to predictions"""
+        return os.path.join(self.models_dir, f'rf_model_{game_type}.npz')
+
+    def _lock(self, game_type):
+        with self.locks_lock:
+            return self.locks.setdefault(game_type, threading.Lock())
+
+    def _artifact_version(self, game_type):
+        """(path, mtime_ns, size) of the artifact to serve; compiled wins over the pickle"""
+        for path in (self.compiled_path(game_type), self.model_path(game_type)):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            return (path, stat.st_mtime_ns, stat.st_size)
+        return None
+
+    def _load(self, path):
+        if path.endswith('.npz'):
+            return CompiledForest.load(path)
+        return joblib.load(path)
+
+    def get(self, game_type):
+        """Current model for game type, or None if none has been trained"""
+        version = self._artifact_version(game_type)
+        current = self.models.get(game_type)
+        if version is None or (current is not None and current.version == version):
+            return current
+
+        with self._lock(game_type):
+            current = self.models.get(game_type)
+            if current is not None and current.version == version:
+                return current  # Another thread reloaded it first
+            try:
+                loaded = LoadedModel(game_type, self._load(version[0]), version)
+            except Exception as e:
+                print(f"Error loading {game_type} model: {e}")
+                return current
+            # Swap by rebinding; predictions holding the old snapshot finish with it
+            self.models[game_type] = loaded
+            return loaded
+
+    def get_estimator(self, game_type):
+        """The full scikit-learn model, loaded from disk (not used on the prediction path)"""
+        path = self.model_path(game_type)
+        if not os.path.exists(path):
+            return None
+        return joblib.load(path)
+
+    def estimator_version(self, game_type):
+        """(mtime_ns, size) of the full scikit-learn artifact, or None if there is none"""
+        try:
+            stat = os.stat(self.model_path(game_type))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def publish(self, game_type, model, X_check=None, base_version=None):
+        """Persist a freshly trained model, compile it, and swap it in atomically
+
+        With base_version (from estimator_version), publish only if the artifact is still the one
+        the model was derived from; returns None if another run (possibly in another process)
+        has replaced it meanwhile.
+        """
+        with self._lock(game_type):
+            if base_version is not None and self.estimator_version(game_type) != base_version:
+                return None
+            self._write(self.model_path(game_type), lambda tmp_path: joblib.dump(model, tmp_path))
+
+            compiled = CompiledForest.from_sklearn(model)
+            if X_check is not None and len(X_check) and not compiled.matches(model, X_check):
+                # Never serve a compiled forest that disagrees with scikit-learn
+                print(f"Compiled {game_type} model failed the parity check; serving the scikit-learn model")
+                if os.path.exists(self.compiled_path(game_type)):
+                    os.remove(self.compiled_path(game_type))
+                served = model
+            else:
+                self._write(self.compiled_path(game_type), compiled.save)
+                served = compiled
+
+            loaded = LoadedModel(game_type, served, self._artifact_version(game_type))
+            self.models[game_type] = loaded
+            return loaded
+
+    def _write(self, path, dump):
+        tmp_path = path + '.tmp'
+        dump(tmp_path)
+        os.replace(tmp_path, path)  # Readers never see a partially written artifact
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, Text
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Float, Text, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -7,16 +7,24 @@ Base = declarative_base()
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (
+        # Admin list pages: newest first (by id), optionally only (un)verified users
+        Index('ix_users_verified_id', 'verified', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     tg_id = Column(String, unique=True, index=True)
     uid = Column(String)
     verified = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     verified_at = Column(DateTime, nullable=True)
 
 class VerifyRequest(Base):
     __tablename__ = 'verify_requests'
+    __table_args__ = (
+        # Admin list pages: newest first (by id), usually only the pending ones
+        Index('ix_verify_requests_status_id', 'status', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     tg_id = Column(String, index=True)
@@ -24,10 +32,14 @@ class VerifyRequest(Base):
     screenshot_path = Column(String)
     status = Column(String, default='pending')  # pending, approved, rejected
     admin_note = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 class Prediction(Base):
     __tablename__ = 'predictions'
+    __table_args__ = (
+        # Latest-per-game lookups seek to the end of one game's range instead of sorting its history
+        Index('ix_predictions_game_type_created_at', 'game_type', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     game_type = Column(String, index=True)  # '30sec', '1min', '3min', '5min'
@@ -36,6 +48,8 @@ class Prediction(Base):
     confidence = Column(Float)
     safe = Column(Boolean)
     model = Column(String)
+    lead_seconds = Column(Float)  # How long before the period closed the prediction was published
+    skipped = Column(Boolean, default=False)  # Period passed without a prediction
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class Setting(Base):
@@ -51,4 +65,24 @@ class Log(Base):
     id = Column(Integer, primary_key=True, index=True)
     message = Column(Text)
     level = Column(String)
-    timestamp = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+class Draw(Base):
+    __tablename__ = 'draws'
+    __table_args__ = (
+        UniqueConstraint('game_type', 'issue_number', name='uq_draws_game_type_issue'),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    game_type = Column(String, index=True)  # '30sec', '1min', '3min', '5min'
+    issue_number = Column(String)
+    number = Column(String)
+    color = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class Lease(Base):
+    __tablename__ = 'leases'
+    
+    name = Column(String, primary_key=True)  # e.g. 'prediction_scheduler'
+    owner = Column(String)
+    expires_at = Column(DateTime)
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+import os
+
+# Draw calendar timezone: issue numbers count periods from local midnight (IST by default)
+DRAW_TZ_OFFSET_MINUTES = int(os.getenv("DRAW_TZ_OFFSET_MINUTES", "330"))
+
+# Our clock may run slightly ahead of the draw server's; earlier "draws" are not a new period
+CLOCK_SKEW_SECONDS = 5
+
+# Issue number layout: YYYYMMDD + game code + period of the day (1-based)
+ISSUE_DATE_DIGITS = 8
+ISSUE_SEQ_DIGITS = 4
+
+def parse_issue(issue):
+    """(date, game code, period of the day) for an issue number, or None if it does not parse"""
+    issue = str(issue)
+    if len(issue) <= ISSUE_DATE_DIGITS + ISSUE_SEQ_DIGITS or not issue.isdigit():
+        return None
+    try:
+        day = datetime.strptime(issue[:ISSUE_DATE_DIGITS], "%Y%m%d")
+    except ValueError:
+        return None
+    return day, issue[ISSUE_DATE_DIGITS:-ISSUE_SEQ_DIGITS], int(issue[-ISSUE_SEQ_DIGITS:])
+
+def period_close(issue, interval_seconds, tz_offset_minutes=DRAW_TZ_OFFSET_MINUTES):
+    """Epoch seconds at which the issue's period closes and its draw is made, or None"""
+    parsed = parse_issue(issue)
+    if parsed is None:
+        return None
+    day, _, seq = parsed
+    midnight = day.replace(tzinfo=timezone(timedelta(minutes=tz_offset_minutes)))
+    return midnight.timestamp() + seq * interval_seconds
+
+def next_issue(issue, interval_seconds):
+    """Issue number of the period after issue, rolling over at midnight"""
+    day, code, seq = parse_issue(issue)
+    if seq >= 86400 // interval_seconds:
+        day, seq = day + timedelta(days=1), 0
+    return f"{day:%Y%m%d}{code}{seq + 1:0{ISSUE_SEQ_DIGITS}d}"
+
+class PeriodClock:
+    """Period boundaries for one game type, derived from issue numbers and re-anchored on observed draws"""
+
+    def __init__(self, interval_seconds, lead_seconds):
+        self.interval_seconds = interval_seconds
+        self.lead_seconds = lead_seconds
+        # Whole periods by which the issue calendar trails the computed one (e.g. a wrong timezone)
+        self.offset_seconds = 0.0
+
+    def close_time(self, issue):
+        close = period_close(issue, self.interval_seconds)
+        return None if close is None else close + self.offset_seconds
+
+    def observe(self, issue, seen_at):
+        """Re-anchor on a freshly published draw, which must have closed within the last period"""
+        close = period_close(issue, self.interval_seconds)
+        if close is None:
+            return
+        delay = seen_at - close + CLOCK_SKEW_SECONDS
+        offset = delay - delay % self.interval_seconds  # Whole periods only; the rest is publish latency
+        if offset != self.offset_seconds:
+            print(f"Re-anchoring {self.interval_seconds}s period clock by {offset - self.offset_seconds:+.0f}s")
+            self.offset_seconds = offset
+
+    def next_boundary(self, now):
+        """Epoch seconds of the next period close after now"""
+        return now - (now - self.offset_seconds) % self.interval_seconds + self.interval_seconds
+
+    def first_tick(self, now):
+        """First fire time at or after now that sits lead_seconds before a period close"""
+        tick = self.next_boundary(now) - self.lead_seconds
+        while tick < now:
+            tick += self.interval_seconds
+        return tick
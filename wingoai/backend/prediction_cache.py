@@ -0,0 +1,76 @@
+from sqlalchemy import select
+from .config import GAME_TYPE_CONFIG
+from .database import get_db
+from .models import Prediction
+from .periods import PeriodClock
+import hashlib
+import json
+import threading
+import time
+
+PREDICTION_FIELDS = ("game_type", "period", "color", "confidence", "safe", "model", "lead_seconds", "timestamp")
+
+def prediction_payload(prediction):
+    """API shape of a stored Prediction row"""
+    return {
+        "game_type": prediction.game_type,
+        "period": prediction.period,
+        "color": prediction.color,
+        "confidence": prediction.confidence,
+        "safe": prediction.safe,
+        "model": prediction.model,
+        "lead_seconds": prediction.lead_seconds,
+        "timestamp": prediction.created_at.isoformat()
+    }
+
+def latest_prediction_ids():
+    """One scalar subquery per game type, so fetching every game's latest prediction is a single
+    statement of index seeks on (game_type, created_at) however long the history grows"""
+    return [
+        select(Prediction.id).where(
+            Prediction.game_type == game_type,
+            Prediction.skipped.isnot(True)
+        ).order_by(Prediction.created_at.desc()).limit(1).scalar_subquery()
+        for game_type in GAME_TYPE_CONFIG
+    ]
+
+class PredictionCache:
+    """Write-through cache of the latest published prediction per game type, for the read endpoints"""
+
+    def __init__(self):
+        self.latest = {}  # game_type -> (payload, etag)
+        self.lock = threading.Lock()
+        self.clocks = {
+            game_type: PeriodClock(config['interval_seconds'], config['lead_seconds'])
+            for game_type, config in GAME_TYPE_CONFIG.items()
+        }
+
+    def put(self, prediction):
+        """Store a just-committed prediction payload, unless a newer one is already cached"""
+        payload = {field: prediction.get(field) for field in PREDICTION_FIELDS}
+        etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16] + '"'
+        with self.lock:
+            current = self.latest.get(payload["game_type"])
+            if current is None or current[0]["timestamp"] <= payload["timestamp"]:
+                self.latest[payload["game_type"]] = (payload, etag)
+
+    def get(self, game_type):
+        """(payload, etag) of the latest prediction, or (None, None) if there is none"""
+        return self.latest.get(game_type, (None, None))
+
+    def load(self):
+        """Warm from the database, e.g. on startup or after missing relayed predictions"""
+        db = get_db()
+        try:
+            for prediction in db.query(Prediction).filter(Prediction.id.in_(latest_prediction_ids())).all():
+                self.put(prediction_payload(prediction))
+        finally:
+            db.close()
+
+    def max_age(self, game_type, now=None):
+        """Seconds until the game's next prediction is due, so clients revalidate right when it lands"""
+        now = now if now is not None else time.time()
+        return max(1, int(self.clocks[game_type].first_tick(now) - now))
+
+# Shared by the scheduler (write-through on commit) and the API (reads, relayed writes)
+prediction_cache = PredictionCache()
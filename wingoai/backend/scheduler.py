@@ -1,32 +1,88 @@
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from .ml_engine import MLEngine, GAME_TYPE_CONFIG
-from .database import get_db
+from .ingestion import IngestionService
+from .ml_engine import MLEngine, GAME_TYPE_CONFIG, INCREMENTAL_EVERY_DRAWS, MIN_CONFIDENCE_FOR_SAFE
+from .metrics import pipeline_latency
 from .models import Prediction
-from datetime import datetime
+from .periods import PeriodClock, next_issue
+from .prediction_cache import prediction_cache, prediction_payload
+from .write_behind import log_event, write_behind
+from ml.trainer import train_all_models
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import asyncio
+import functools
 import json
-import requests
+import os
 import time
 
+# Give up waiting for the previous draw this close to the period's close
+MIN_LEAD_SECONDS = 3
+DRAW_RETRY_SECONDS = 1.0
+
+# After a failed background training run for a missing model, wait this many periods before retrying
+TRAINING_RETRY_PERIODS = 20
+
+# Threads for blocking pipeline work (draw API, database, inference, retrain hand-off)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+
 class PredictionScheduler:
+    """Runs the ingest→predict→store→broadcast pipeline as asyncio jobs on the API's event loop"""
+
     def __init__(self, websocket_manager):
-        self.scheduler = BackgroundScheduler()
+        # Bound to the running loop on start(); coroutine jobs run as tasks on it
+        self.scheduler = AsyncIOScheduler()
+        self.executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix='pipeline')
+        # Training runs wait here, one at a time, so they neither hold pipeline threads nor stack
+        # their process pools beyond the training CPU budget
+        self.training_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='training')
         self.ml_engine = MLEngine()
+        self.ingestion = IngestionService(self.ml_engine.history_store)
         self.websocket_manager = websocket_manager
+        self.draws_since_retrain = {game_type: 0 for game_type in GAME_TYPE_CONFIG}
+        self.draws_since_update = {game_type: 0 for game_type in GAME_TYPE_CONFIG}
+        self.clocks = {
+            game_type: PeriodClock(config['interval_seconds'], config['lead_seconds'])
+            for game_type, config in GAME_TYPE_CONFIG.items()
+        }
+        self.last_period = {game_type: None for game_type in GAME_TYPE_CONFIG}  # Predicted or marked skipped
+        self.training = set()  # Game types with a full training run in flight (missing model or daily)
+        self.training_failed_at = {}  # game_type -> time of the last failed missing-model training
+        self.missing_models = set()  # Game types waiting for the next missing-model training run
+        self.missing_training_task = None
+        self.latency = pipeline_latency
+        self.ingestion.subscribe(self.on_draws_for_clock)
+        self.ingestion.subscribe(self.on_draws_for_retrain)
         self.setup_jobs()
 
     def setup_jobs(self):
-        # Schedule prediction jobs for each game type
+        # Fill the draw store once, then tick each game type on its period boundaries
+        self.scheduler.add_job(
+            self.run_blocking,
+            args=[self.ingestion.bootstrap],
+            id='ingestion_bootstrap_job',
+            name='Ingest initial draw history',
+            replace_existing=True
+        )
         for game_type, config in GAME_TYPE_CONFIG.items():
+            clock = self.clocks[game_type]
+            # Fire times are start_date + n * interval, so slow ticks never shift later ones
+            first_tick = datetime.fromtimestamp(clock.first_tick(time.time()), timezone.utc)
             self.scheduler.add_job(
-                self.run_prediction,
-                trigger=IntervalTrigger(seconds=config['interval_seconds']),
+                self.run_period,
+                trigger=IntervalTrigger(seconds=config['interval_seconds'], start_date=first_tick),
                 args=[game_type],
                 id=f'prediction_job_{game_type}',
-                name=f'Run {game_type} prediction every {config["interval_seconds"]} seconds',
+                name=f'Predict {game_type} {config["lead_seconds"]}s before each period closes',
+                # A late tick still runs while the period is open; missed ones collapse into one,
+                # and a tick still running when the next is due makes that one skip
+                misfire_grace_time=max(1, config['lead_seconds'] - MIN_LEAD_SECONDS),
+                coalesce=True,
+                max_instances=1,
                 replace_existing=True
             )
+        self.scheduler.add_listener(self.on_tick_lost, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
         
         # Schedule model retraining daily for all game types
         self.scheduler.add_job(
@@ -39,94 +95,269 @@ class PredictionScheduler:
         )
 
     def start(self):
+        """Start on the running event loop; call from the application's startup hook"""
         self.scheduler.start()
         print("Scheduler started with multi-game support...")
 
     def shutdown(self):
-        self.scheduler.shutdown()
+        self.scheduler.shutdown(wait=False)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.training_executor.shutdown(wait=False, cancel_futures=True)
+        write_behind.flush()
         print("Scheduler stopped...")
 
-    def fetch_history(self, game_type):
-        """Fetch recent history from API for specific game type"""
-        if game_type not in GAME_TYPE_CONFIG:
-            raise ValueError(f"Invalid game type: {game_type}")
-            
-        history = []
-        for page in range(1, 6):  # Get last 5 pages
-            try:
-                endpoint = GAME_TYPE_CONFIG[game_type]['api_endpoint']
-                url = f"https://draw.ar-lottery01.com/WinGo/{endpoint}/GetHistoryIssuePage.json?pageNo={page}"
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'data' in data and 'list' in data['data']:
-                        history.extend(data['data']['list'])
-            except Exception as e:
-                print(f"Error fetching {game_type} page {page}: {e}")
-                continue
-        return history
+    async def run_blocking(self, fn, *args):
+        """Run blocking work on the bounded pipeline pool without stalling the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args))
+
+    async def run_training(self, game_types):
+        """train_all_models on the training thread; one run at a time shares the CPU budget"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.training_executor, functools.partial(train_all_models, game_types)
+        )
+
+    def on_tick_lost(self, event):
+        """Count ticks APScheduler dropped: too late to run, or the previous one still running"""
+        if event.job_id.startswith('prediction_job_'):
+            game_type = event.job_id[len('prediction_job_'):]
+            reason = 'overrun' if event.code == EVENT_JOB_MAX_INSTANCES else 'missed'
+            self.latency.count(game_type, reason)
+            log_event(f"{game_type} tick dropped ({reason})", "WARNING")
+
+    def on_draws_for_clock(self, game_type, new_draws):
+        """Clock subscriber: re-anchor period boundaries on the newest published draw"""
+        self.clocks[game_type].observe(new_draws[0]['issueNumber'], time.time())
+
+    def on_draws_for_retrain(self, game_type, new_draws):
+        """Retrainer subscriber: warm-start the model every INCREMENTAL_EVERY_DRAWS new draws"""
+        self.draws_since_retrain[game_type] += len(new_draws)
+        self.draws_since_update[game_type] += len(new_draws)
+        
+        if self.draws_since_update[game_type] >= INCREMENTAL_EVERY_DRAWS:
+            self.draws_since_update[game_type] = 0
+            # Run off the ingestion thread; replace_existing collapses a pending duplicate
+            self.scheduler.add_job(
+                self.run_incremental_update,
+                args=[game_type],
+                id=f'incremental_update_job_{game_type}',
+                name=f'Incremental {game_type} model update',
+                replace_existing=True
+            )
+
+    async def run_incremental_update(self, game_type):
+        # A full training run is about to replace the model; its predecessor is not worth growing
+        if game_type in self.training:
+            print(f"Skipping {game_type} incremental update: a full training run is in progress")
+            return
+        await self.run_blocking(self.ml_engine.update_model, game_type)
+
+    async def run_period(self, game_type):
+        """Aligned tick: ingest the draw that just closed, then predict the period still open"""
+        started = time.perf_counter()
+        try:
+            await self.predict_period(game_type)
+        finally:
+            self.latency.record(game_type, 'total', time.perf_counter() - started)
+
+    async def predict_period(self, game_type):
+        clock = self.clocks[game_type]
+        deadline = clock.next_boundary(time.time()) - MIN_LEAD_SECONDS
+        started = time.perf_counter()
+        await self.run_blocking(self.ingestion.poll, game_type)
+        history = await self.run_blocking(self.ml_engine.history_store.get_history, game_type, 100)
+        self.latency.record(game_type, 'fetch', time.perf_counter() - started)
+        if not history:
+            print(f"No {game_type} history to predict from")
+            return
+
+        target = self.target_period(game_type, history)
+        if target is None:
+            # Unrecognised issue format: no calendar, so predict the draw after the latest one
+            await self.run_prediction(game_type, history)
+            return
+
+        # The previous draw can be published late; keep polling while the period is still open
+        started = time.perf_counter()
+        while clock.close_time(target) < deadline and time.time() < deadline:
+            await asyncio.sleep(DRAW_RETRY_SECONDS)
+            if await self.run_blocking(self.ingestion.poll, game_type):
+                history = await self.run_blocking(self.ml_engine.history_store.get_history, game_type, 100)
+                target = self.target_period(game_type, history)
+        if time.perf_counter() - started > DRAW_RETRY_SECONDS / 2:
+            self.latency.record(game_type, 'draw_wait', time.perf_counter() - started)
+
+        if clock.close_time(target) < deadline:
+            # Still missing earlier draws: the open period cannot be predicted in time
+            open_period = target
+            while clock.close_time(open_period) < deadline:
+                open_period = next_issue(open_period, clock.interval_seconds)
+            log_event(f"{game_type} draws before {open_period} not published in time", "WARNING")
+            self.latency.count(game_type, 'late_draw')
+            await self.run_blocking(self.mark_skipped, game_type, open_period, True)
+            return
+
+        if target == self.last_period[game_type]:
+            return  # Already predicted by an earlier tick
+        await self.run_blocking(self.mark_skipped, game_type, target, False)
+        await self.run_prediction(game_type, history, target, deadline)
 
-    def run_prediction(self, game_type):
+    def target_period(self, game_type, history):
+        """Issue number of the period after the latest stored draw, or None if it does not parse"""
+        try:
+            return next_issue(history[0]['issueNumber'], self.clocks[game_type].interval_seconds)
+        except (TypeError, ValueError):
+            return None
+
+    def mark_skipped(self, game_type, until_issue, inclusive):
+        """Record the periods since the last tick's that passed without a prediction"""
+        interval = self.clocks[game_type].interval_seconds
+        last = self.last_period[game_type]
+        issue = next_issue(last, interval) if last else until_issue
+        if inclusive:
+            self.last_period[game_type] = until_issue
+
+        skipped = []
+        # Bounded to a day's worth of periods after a long outage
+        while (issue < until_issue or (inclusive and issue == until_issue)) and len(skipped) < 86400 // interval:
+            skipped.append(issue)
+            issue = next_issue(issue, interval)
+        if not skipped:
+            return
+
+        created_at = datetime.utcnow()
+        write_behind.add(*[
+            Prediction(
+                game_type=game_type,
+                period=period,
+                color='SKIPPED',
+                confidence=0.0,
+                safe=False,
+                model=f'ensemble_rf_{game_type}',
+                skipped=True,
+                created_at=created_at
+            )
+            for period in skipped
+        ])
+        print(f"Marked {len(skipped)} {game_type} periods skipped ({skipped[0]}..{skipped[-1]})")
+
+    async def run_prediction(self, game_type, history, target_issue=None, deadline=None):
         """Run prediction and store results for specific game type"""
         print(f"Running {game_type} prediction...")
         
-        # Fetch recent history
-        history = self.fetch_history(game_type)
-        
         if len(history) < 50:
             print(f"Not enough {game_type} history data for prediction")
             return
         
+        # Never train on the tick: start a background run and skip until the model is published
+        if await self.run_blocking(self.ml_engine.load_model, game_type) is None:
+            self.schedule_training(game_type)
+            return
+        
         # Make prediction using ML
-        predicted_color, confidence = self.ml_engine.predict_next(game_type, history)
+        timings = {}
+        predicted_color, confidence = await self.run_blocking(
+            self.ml_engine.predict_next, game_type, history, timings
+        )
+        for stage, seconds in timings.items():
+            self.latency.record(game_type, stage, seconds)
         
         if predicted_color is None:
             print(f"{game_type} prediction failed")
             return
         
+        # Skip if stale: a prediction for a period that has (nearly) closed is worse than none
+        if deadline is not None and time.time() > deadline:
+            print(f"{game_type} prediction for {target_issue} missed its deadline; skipping")
+            self.latency.count(game_type, 'stale')
+            return
+        
         # Determine if it's safe to play
-        safe = confidence >= 0.80
+        safe = bool(confidence >= MIN_CONFIDENCE_FOR_SAFE)
         
-        # Store prediction in database
-        db = get_db()
-        try:
-            prediction = Prediction(
-                game_type=game_type,
-                period=history[0]['issueNumber'] if history else str(int(time.time())),
-                color=predicted_color,
-                confidence=confidence,
-                safe=safe,
-                model=f'ensemble_rf_{game_type}'
-            )
-            db.add(prediction)
-            db.commit()
-            
-            # Broadcast to WebSocket clients
-            prediction_data = {
-                "game_type": prediction.game_type,
-                "period": prediction.period,
-                "color": prediction.color,
-                "confidence": prediction.confidence,
-                "safe": prediction.safe,
-                "model": prediction.model,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-            asyncio.run(self.websocket_manager.broadcast_prediction(prediction_data))
-            print(f"{game_type} Prediction: {predicted_color}, Confidence: {confidence:.2f}, Safe: {safe}")
-            
-        except Exception as e:
-            print(f"Error storing {game_type} prediction: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        # Only queues the insert, so it runs on the loop
+        started = time.perf_counter()
+        prediction_data = self.store_prediction(game_type, history, target_issue, predicted_color, confidence, safe)
+        self.latency.record(game_type, 'db', time.perf_counter() - started)
+        
+        # Broadcast to WebSocket clients; we are on the loop that owns their connections
+        started = time.perf_counter()
+        await self.websocket_manager.broadcast_prediction(prediction_data)
+        self.latency.record(game_type, 'broadcast', time.perf_counter() - started)
+        print(f"{game_type} Prediction for {prediction_data['period']}: {predicted_color}, "
+              f"Confidence: {confidence:.2f}, Safe: {safe}, Lead: {prediction_data['lead_seconds'] or 0:.1f}s")
+
+    def store_prediction(self, game_type, history, target_issue, predicted_color, confidence, safe):
+        """Queue the prediction for the database and cache it; returns the broadcast payload"""
+        # Lead: how long before the predicted period closes this is published
+        close_time = self.clocks[game_type].close_time(target_issue) if target_issue else None
+        prediction = Prediction(
+            game_type=game_type,
+            period=target_issue or history[0]['issueNumber'],
+            color=predicted_color,
+            # Built from this object, not a reloaded row, so numpy scalars must not reach the payload
+            confidence=float(confidence),
+            safe=bool(safe),
+            model=f'ensemble_rf_{game_type}',
+            lead_seconds=close_time - time.time() if close_time else None,
+            created_at=datetime.utcnow()
+        )
+        if target_issue:
+            self.last_period[game_type] = target_issue
+        
+        # Write-through: readers see it right away; the row is committed with the next batch
+        prediction_data = prediction_payload(prediction)
+        prediction_cache.put(prediction_data)
+        write_behind.add(prediction)
+        return prediction_data
 
-    def retrain_all_models(self):
-        """Retrain all ML models"""
+    def schedule_training(self, game_type):
+        """Train a missing model in a background job: one run at a time, backing off after a failure"""
+        if game_type in self.training:
+            return
+        # Usually too little history yet: retrying every tick would just spawn a training pool per period
+        failed_at = self.training_failed_at.get(game_type)
+        retry_seconds = TRAINING_RETRY_PERIODS * GAME_TYPE_CONFIG[game_type]['interval_seconds']
+        if failed_at is not None and time.time() - failed_at < retry_seconds:
+            return
+        self.training.add(game_type)
+        self.missing_models.add(game_type)
+        print(f"{game_type} model not found, training it in the background...")
+        # One task trains every missing model in shared runs; game types found missing while a run
+        # is in flight go into the next one
+        if self.missing_training_task is None or self.missing_training_task.done():
+            self.missing_training_task = asyncio.create_task(self.train_missing_models())
+
+    async def train_missing_models(self):
+        while self.missing_models:
+            game_types = sorted(self.missing_models)
+            self.missing_models.clear()
+            results = {}
+            try:
+                results = await self.run_training(game_types)
+            except Exception as e:
+                print(f"Error training missing models: {e}")
+            finally:
+                for game_type in game_types:
+                    self.training.discard(game_type)
+                    if results.get(game_type, {}).get("success"):
+                        self.training_failed_at.pop(game_type, None)
+                    else:
+                        self.training_failed_at[game_type] = time.time()
+                        print(f"{game_type} training failed; retrying in {TRAINING_RETRY_PERIODS} periods at the earliest")
+
+    async def retrain_all_models(self):
+        """Retrain all ML models in worker processes; ticks keep serving the current models"""
         print("Retraining all models...")
-        for game_type in GAME_TYPE_CONFIG.keys():
-            success = self.ml_engine.train_model(game_type)
-            if success:
-                print(f"{game_type} model retrained successfully")
-            else:
-                print(f"{game_type} model retraining failed")
\ No newline at end of file
+        # Game types already training (a missing model) get their fresh model from that run
+        game_types = [game_type for game_type in GAME_TYPE_CONFIG if game_type not in self.training]
+        if not game_types:
+            return
+        self.training.update(game_types)
+        try:
+            results = await self.run_training(game_types)
+        finally:
+            self.training.difference_update(game_types)
+        for game_type, result in results.items():
+            if result["success"]:
+                self.draws_since_retrain[game_type] = 0
+                self.draws_since_update[game_type] = 0
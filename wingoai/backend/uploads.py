@@ -0,0 +1,49 @@
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+import hashlib
+import os
+import re
+import tempfile
+
+UPLOADS_DIR = os.getenv("UPLOADS_DIR", "uploads")
+MAX_SCREENSHOT_MB = int(os.getenv("MAX_SCREENSHOT_MB", "10"))
+MAX_SCREENSHOT_BYTES = MAX_SCREENSHOT_MB * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 256 * 1024
+
+class UploadTooLarge(Exception):
+    pass
+
+def file_extension(filename):
+    """Lowercased extension from a client-supplied name, or 'bin' if it has none worth trusting"""
+    _, dot, extension = (filename or "").rpartition(".")
+    return extension.lower() if dot and re.fullmatch(r"[A-Za-z0-9]{1,8}", extension) else "bin"
+
+async def save_screenshot(upload: UploadFile, max_bytes=MAX_SCREENSHOT_BYTES):
+    """Stream an upload to disk in chunks, hashing as it goes; returns its content-addressed path.
+
+    The same bytes always land at uploads/<sha256>.<ext>, so a retried upload reuses the stored file.
+    """
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    # Partial file next to the final one, so publishing it is an atomic rename
+    fd, partial_path = tempfile.mkstemp(dir=UPLOADS_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as partial:
+            while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Screenshot larger than {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                await run_in_threadpool(partial.write, chunk)
+        
+        file_path = os.path.join(UPLOADS_DIR, f"{digest.hexdigest()}.{file_extension(upload.filename)}")
+        if os.path.exists(file_path):
+            os.remove(partial_path)  # Already stored: a retry of the same screenshot
+        else:
+            os.replace(partial_path, file_path)
+        return file_path
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
@@ -0,0 +1,66 @@
+"""Standalone prediction worker: the one process that ingests draws, predicts and retrains.
+
+    python -m backend.worker
+
+Start as many as you like; a database lease elects a single leader and the rest stand
+by. API processes started with EMBEDDED_SCHEDULER=0 relay its broadcasts to their
+WebSocket clients.
+"""
+from .broadcast_bus import BroadcastPublisher
+from .database import init_db
+from .leader import LeaderLease
+from .metrics import pipeline_latency
+from .scheduler import PredictionScheduler
+import asyncio
+import signal
+
+# How often the leader shares its pipeline latency with the API processes
+LATENCY_PUBLISH_SECONDS = 10
+
+class PredictionWorker:
+    def __init__(self):
+        self.lease = LeaderLease('prediction_scheduler')
+        self.publisher = BroadcastPublisher()
+        self.scheduler = None
+        self.latency_task = None
+
+    async def on_elected(self):
+        await self.publisher.start()
+        self.scheduler = PredictionScheduler(self.publisher)
+        self.scheduler.start()
+        self.latency_task = asyncio.create_task(self.publish_latency())
+
+    async def on_demoted(self):
+        # Jobs already running finish; no new ones start
+        if self.scheduler:
+            self.scheduler.shutdown()
+            self.scheduler = None
+        if self.latency_task:
+            self.latency_task.cancel()
+            self.latency_task = None
+        await self.publisher.close()
+
+    async def publish_latency(self):
+        while True:
+            await asyncio.sleep(LATENCY_PUBLISH_SECONDS)
+            await self.publisher.publish('latency', pipeline_latency.summary())
+
+    async def run(self):
+        init_db()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        print(f"Prediction worker {self.lease.owner} started")
+        campaign = asyncio.create_task(self.lease.hold(self.on_elected, self.on_demoted))
+        await stop.wait()
+        campaign.cancel()
+        await asyncio.gather(campaign, return_exceptions=True)
+        print("Prediction worker stopped")
+
+def main():
+    asyncio.run(PredictionWorker().run())
+
+if __name__ == "__main__":
+    main()
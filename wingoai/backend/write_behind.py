@@ -0,0 +1,98 @@
+from .database import get_db
+from .models import Log
+from datetime import datetime
+import atexit
+import os
+import queue
+import threading
+import time
+
+# A queued row is written at most this long after it was queued, with up to this many per transaction
+WRITE_BEHIND_MAX_DELAY_MS = int(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "250"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "500"))
+
+_STOP = object()
+
+class WriteBehindQueue:
+    """Inserts ORM rows from a background thread, grouping whatever arrives close together into one commit"""
+
+    def __init__(self, max_delay=WRITE_BEHIND_MAX_DELAY_MS / 1000, max_batch=WRITE_BEHIND_MAX_BATCH):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def add(self, *rows):
+        """Queue new (transient) rows; callers must not touch them afterwards"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='write-behind', daemon=True)
+                self.thread.start()
+            for row in rows:
+                self.queue.put(row)
+
+    def run(self):
+        while True:
+            row = self.queue.get()
+            if row is _STOP:
+                return
+            batch = [row]
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_batch:
+                try:
+                    row = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            self.write(batch)
+            if stopping:
+                return
+
+    def write(self, batch):
+        if self.commit(batch):
+            return
+        # These rows were already served and broadcast; one bad row or a transient lock must not
+        # lose the rest of the batch, so retry each on its own
+        print(f"Retrying {len(batch)} queued rows one by one")
+        lost = sum(not self.commit([row]) for row in batch)
+        if lost:
+            print(f"Dropped {lost} of {len(batch)} queued rows")
+
+    def commit(self, rows):
+        """Insert rows in one transaction; returns whether it committed"""
+        db = get_db()
+        try:
+            db.add_all(rows)
+            db.commit()
+            return True
+        except Exception as e:
+            print(f"Error writing {len(rows)} queued rows: {e}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def flush(self):
+        """Write everything queued so far and stop the thread; the next add() starts a new one"""
+        with self.lock:
+            if self.thread is None:
+                return
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+
+def log_event(message, level="INFO"):
+    """Print, and keep a copy in the logs table"""
+    print(message)
+    write_behind.add(Log(message=message, level=level, timestamp=datetime.utcnow()))
+
+# Shared by everything that inserts rows nobody reads back right away (predictions, logs)
+write_behind = WriteBehindQueue()
+
+# Daemon threads die with the interpreter; exit hooks still run before that
+atexit.register(write_behind.flush)
@@ -0,0 +1,230 @@
+"""Benchmarks for the prediction hot path on synthetic draw histories.
+
+    python -m benchmarks.run --sizes 1000,10000,100000 --output benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+
+Every size runs in a fresh process against its own temporary database and model
+directory, so timings and peak memory are not skewed by earlier sizes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+STORE_CHUNK = 5000  # Draws per HistoryStore.store call (bounded by SQLite's bind limit)
+
+# Relative slowdown (or growth) against the baseline reported as a regression
+REGRESSION_THRESHOLD = 0.20
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def _peak_alloc_mb(fn, *args):
+    """Peak Python/numpy allocation while running fn, measured in a separate pass"""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _percentiles_ms(samples):
+    samples = np.asarray(samples) * 1000
+    return {"p50": float(np.percentile(samples, 50)), "p95": float(np.percentile(samples, 95))}
+
+def run_size(size, game_type, ticks, requests):
+    """All measurements for one history size; executed in a worker process"""
+    workdir = tempfile.mkdtemp(prefix=f"wingo-bench-{size}-")
+    os.chdir(workdir)  # MLEngine keeps its models under ./ml/models
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    try:
+        return _measure(size, game_type, ticks, requests)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _measure(size, game_type, ticks, requests):
+    # Imported here so the database settings above are the ones picked up
+    from backend import api
+    from backend.database import SessionLocal, init_db
+    from backend.ml_engine import MLEngine, GAME_TYPE_CONFIG
+    from backend.model_registry import ModelRegistry
+    from backend.models import Prediction
+    from ml.feature_builder import DrawArrays, build_feature_matrix, build_features
+    from ml.synthetic import generate_draws_fast, synthetic_draw
+
+    init_db()
+    endpoint = GAME_TYPE_CONFIG[game_type]['api_endpoint']
+    interval = GAME_TYPE_CONFIG[game_type]['interval_seconds']
+    results = {"size": size}
+
+    history, results["generate_s"] = _timed(generate_draws_fast, size, endpoint, interval)
+
+    ml_engine = MLEngine()
+    _, results["features_s"] = _timed(ml_engine.prepare_features, history)
+    _, results["feature_matrix_s"] = _timed(lambda: build_feature_matrix(DrawArrays.from_history(history)))
+    results["features_peak_alloc_mb"] = _peak_alloc_mb(build_features, history)
+
+    def store():
+        for start in range(0, size, STORE_CHUNK):
+            ml_engine.history_store.store(game_type, history[start:start + STORE_CHUNK])
+    _, results["store_s"] = _timed(store)
+
+    trained, results["train_s"] = _timed(ml_engine.train_model, game_type, limit=size)
+    if not trained:
+        results["error"] = "training failed"
+        return results
+    results["train_stages_s"] = ml_engine.training_timings[game_type]
+    results["train_peak_rss_mb"] = _peak_rss_mb()
+
+    # Cold loads, as after a restart or a newly published model
+    _, results["model_load_s"] = _timed(ModelRegistry(ml_engine.models_dir).get, game_type)
+    _, results["estimator_load_s"] = _timed(ModelRegistry(ml_engine.models_dir).get_estimator, game_type)
+
+    # Steady-state ticks: one new draw per call over the scheduler's 100-draw window
+    window = history[:100]
+    ml_engine.predict_next(game_type, window)
+    tick_samples = []
+    for i in range(ticks):
+        window = [synthetic_draw(endpoint, interval, size + i)] + window[:-1]
+        _, seconds = _timed(ml_engine.predict_next, game_type, window)
+        tick_samples.append(seconds)
+    results["tick_ms"] = _percentiles_ms(tick_samples)
+
+    # Read endpoints, called in-process with one stored prediction per draw and game type
+    db = SessionLocal()
+    try:
+        for name in GAME_TYPE_CONFIG:
+            db.add_all([
+                Prediction(game_type=name, period=draw["issueNumber"], color=draw["color"],
+                           confidence=0.5, safe=False, model="RandomForest")
+                for draw in history
+            ])
+        db.commit()
+    finally:
+        db.close()
+    # The endpoints serve from the cache; warming it is the one query they depend on
+    from backend.prediction_cache import prediction_cache
+    results["cache_load_ms"] = _timed(prediction_cache.load)[1] * 1000
+    for name, handler in (("predict_game_ms", lambda: api.get_latest_prediction(game_type)),
+                          ("predict_all_ms", api.get_all_predictions)):
+        samples = [_timed(asyncio.run, handler())[1] for _ in range(requests)]
+        results[name] = _percentiles_ms(samples)
+
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+def run(sizes, game_type="1min", ticks=200, requests=50):
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for size in sizes:
+        print(f"Benchmarking {size} draws...")
+        # One process per size: peak RSS is per process and never goes down
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[str(size)] = executor.submit(run_size, size, game_type, ticks, requests).result()
+        print(_summary(results[str(size)]))
+    return {"meta": _meta(game_type), "results": results}
+
+def _meta(game_type):
+    import sklearn
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "game_type": game_type,
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+def _summary(result):
+    if "error" in result:
+        return f"  {result['error']}"
+    return (f"  features {result['features_s']:.3f}s, train {result['train_s']:.2f}s, "
+            f"model load {result['model_load_s'] * 1000:.1f}ms, tick p50 {result['tick_ms']['p50']:.2f}ms, "
+            f"/predict p50 {result['predict_all_ms']['p50']:.2f}ms, peak RSS {result['peak_rss_mb']:.0f}MB")
+
+def _flatten(result, prefix=""):
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and key != "size":
+            flat[prefix + key] = value
+    return flat
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Print every metric against the baseline; returns the metrics that regressed"""
+    regressions = []
+    for size, result in current["results"].items():
+        if size not in baseline["results"]:
+            print(f"{size} draws: not in baseline")
+            continue
+        before = _flatten(baseline["results"][size])
+        for metric, value in _flatten(result).items():
+            if not before.get(metric):
+                continue
+            change = value / before[metric] - 1
+            flag = "  REGRESSION" if change > threshold else ""
+            print(f"{size:>8} {metric:<28} {before[metric]:>12.4f} -> {value:>12.4f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((size, metric, change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated history sizes in draws")
+    parser.add_argument("--game-type", default="1min")
+    parser.add_argument("--ticks", type=int, default=200, help="Prediction ticks timed per size")
+    parser.add_argument("--requests", type=int, default=50, help="Endpoint calls timed per size")
+    parser.add_argument("--output", help="Save results as JSON (e.g. a new baseline)")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    current = run(sizes, args.game_type, args.ticks, args.requests)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.compare} (commit {baseline['meta'].get('commit')}):")
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,9 @@ api_hash = os.getenv("API_HASH")
 bot_token = os.getenv("ADMIN_BOT_TOKEN")
 admin_tg_id = os.getenv("ADMIN_TG_ID")
 
+# Pending requests sent per /requests page; each is one photo message
+REQUESTS_PAGE_SIZE = 10
+
 app = Client(
     "admin_bot",
     api_id=api_id,
@@ -33,11 +36,18 @@ async def show_requests(client: Client, message: Message):
         await message.reply_text("❌ You are not authorized to use this bot!")
         return
     
+    await send_requests_page(message)
+
+async def send_requests_page(message: Message, cursor=None):
+    """Send one page of pending requests, with a button for the next (older) page"""
     try:
-        response = requests.get("http://localhost:8000/admin/verify-requests")
+        params = {"status": "pending", "limit": REQUESTS_PAGE_SIZE}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = requests.get("http://localhost:8000/admin/verify-requests", params=params)
         if response.status_code == 200:
-            requests_data = response.json()
-            pending_requests = [r for r in requests_data if r["status"] == "pending"]
+            page = response.json()
+            pending_requests = page["items"]
             
             if not pending_requests:
                 await message.reply_text("✅ No pending verification requests.")
@@ -61,6 +71,14 @@ async def show_requests(client: Client, message: Message):
                     """,
                     reply_markup=keyboard
                 )
+            
+            if page["next_cursor"] is not None:
+                await message.reply_text(
+                    "More pending requests:",
+                    reply_markup=InlineKeyboardMarkup([
+                        [InlineKeyboardButton("➡️ Next page", callback_data=f"requests_{page['next_cursor']}")]
+                    ])
+                )
         else:
             await message.reply_text("Error fetching requests. Please try again.")
     except Exception as e:
@@ -73,14 +91,17 @@ async def handle_callback(client: Client, callback_query):
         return
     
     data = callback_query.data
-    if data.startswith("approve_") or data.startswith("reject_"):
+    if data.startswith("requests_"):
+        await callback_query.answer()
+        await send_requests_page(callback_query.message, cursor=int(data.split("_")[1]))
+    elif data.startswith("approve_") or data.startswith("reject_"):
         request_id = int(data.split("_")[1])
         action = "approve" if data.startswith("approve_") else "reject"
         
         try:
             response = requests.post(
                 "http://localhost:8000/admin/verify",
-                data={
+                params={
                     "request_id": request_id,
                     "action": action
                 }
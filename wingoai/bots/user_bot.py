@@ -168,7 +168,7 @@ async def send_prediction(message: Message, game_type: str):
         response = requests.get(f"http://localhost:8000/predict/{game_type}")
         if response.status_code == 200:
             data = response.json()
-            if "period" in 
+            if "period" in data:
                 color = data["color"]
                 confidence = data["confidence"]
                 safe = data["safe"]
@@ -0,0 +1,155 @@
+"""Walk-forward backtesting of the per-game-type models on stored draw history.
+
+    python -m ml.backtest --game-type 30sec --folds 6 --train-size 20000 --output backtest.json
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ml_engine import MLEngine, GAME_TYPE_CONFIG, MIN_CONFIDENCE_FOR_SAFE
+from ml.feature_builder import DrawArrays, build_feature_matrix, training_rows
+
+CALIBRATION_BINS = np.linspace(0.0, 1.0, 11)
+
+# Per-worker copies of the shared feature matrix, set once by the pool initializer
+_X = None
+_y = None
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+def fold_arrays(split):
+    """(X_train, y_train, X_test, y_test) of a walk-forward split, from the worker's shared matrix"""
+    train_start, train_end, test_end = split
+    return _X[train_start:train_end], _y[train_start:train_end], _X[train_end:test_end], _y[train_end:test_end]
+
+def walk_forward_folds(n_rows, folds, train_size=None, min_train=200):
+    """(train_start, train_end, test_end) row ranges; each fold tests on data after its training window"""
+    chunk = n_rows // (folds + 1)
+    splits = []
+    for fold in range(1, folds + 1):
+        train_end = chunk * fold
+        test_end = n_rows if fold == folds else chunk * (fold + 1)
+        train_start = max(0, train_end - train_size) if train_size else 0
+        if train_end - train_start >= min_train and test_end > train_end:
+            splits.append((train_start, train_end, test_end))
+    return splits
+
+def _run_fold(game_type, split, n_jobs):
+    X_train, y_train, X_test, y_test = fold_arrays(split)
+    started = time.perf_counter()
+    model = MLEngine(n_jobs=n_jobs).build_model(game_type)
+    model.fit(X_train, y_train)
+
+    probabilities = model.predict_proba(X_test)
+    best = np.argmax(probabilities, axis=1)
+    return {
+        "split": split,
+        "predicted": model.classes_[best],
+        "confidence": probabilities[np.arange(len(best)), best],
+        "actual": y_test,
+        "seconds": time.perf_counter() - started
+    }
+
+def summarize(predicted, confidence, actual):
+    """Accuracy, coverage and accuracy of safe predictions, and a calibration curve"""
+    correct = predicted == actual
+    safe = confidence >= MIN_CONFIDENCE_FOR_SAFE
+    calibration = []
+    bins = np.clip(np.digitize(confidence, CALIBRATION_BINS) - 1, 0, len(CALIBRATION_BINS) - 2)
+    for b in range(len(CALIBRATION_BINS) - 1):
+        in_bin = bins == b
+        if in_bin.any():
+            calibration.append({
+                "bin": [float(CALIBRATION_BINS[b]), float(CALIBRATION_BINS[b + 1])],
+                "count": int(in_bin.sum()),
+                "mean_confidence": float(confidence[in_bin].mean()),
+                "accuracy": float(correct[in_bin].mean())
+            })
+    return {
+        "predictions": int(len(actual)),
+        "accuracy": float(correct.mean()) if len(actual) else None,
+        "safe_coverage": float(safe.mean()) if len(actual) else None,
+        "safe_accuracy": float(correct[safe].mean()) if safe.any() else None,
+        "calibration": calibration
+    }
+
+def backtest(game_type, history, folds=5, train_size=None, workers=None, n_jobs=1):
+    """Walk-forward backtest over history (API-shaped records), training folds in parallel"""
+    draws = DrawArrays.from_history(history)
+    matrix = build_feature_matrix(draws)  # Computed once, shared by every fold
+    rows, y = training_rows(draws, matrix)
+    X = matrix[rows]
+
+    splits = walk_forward_folds(len(rows), folds, train_size)
+    if not splits:
+        return {"game_type": game_type, "rows": int(len(rows)), "folds": [], "overall": summarize(*[np.array([])] * 3)}
+
+    workers = workers or min(len(splits), os.cpu_count() or 1)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(X, y)) as executor:
+        results = list(executor.map(_run_fold, [game_type] * len(splits), splits, [n_jobs] * len(splits)))
+
+    fold_reports = []
+    for result in results:
+        train_start, train_end, test_end = result["split"]
+        report = summarize(result["predicted"], result["confidence"], result["actual"])
+        report.pop("calibration")
+        report.update({
+            "train_rows": train_end - train_start,
+            "test_from_issue": str(draws.issues[rows[train_end]]),
+            "test_to_issue": str(draws.issues[rows[test_end - 1]]),
+            "seconds": round(result["seconds"], 2)
+        })
+        fold_reports.append(report)
+
+    overall = summarize(
+        np.concatenate([r["predicted"] for r in results]),
+        np.concatenate([r["confidence"] for r in results]),
+        np.concatenate([r["actual"] for r in results])
+    )
+    return {"game_type": game_type, "rows": int(len(rows)), "folds": fold_reports, "overall": overall}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--game-type", choices=list(GAME_TYPE_CONFIG), action="append",
+                        help="Game type to backtest (repeatable; default: all)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--train-size", type=int, help="Rolling training window in rows (default: expanding)")
+    parser.add_argument("--limit", type=int, default=300000, help="Most recent stored draws to replay")
+    parser.add_argument("--workers", type=int, help="Fold processes (default: one per fold, up to the core count)")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Cores per fold for tree building")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    ml_engine = MLEngine()
+    reports = {}
+    for game_type in args.game_type or GAME_TYPE_CONFIG.keys():
+        started = time.perf_counter()
+        history = ml_engine.fetch_history(game_type, limit=args.limit)
+        report = backtest(game_type, history, args.folds, args.train_size, args.workers, args.n_jobs)
+        reports[game_type] = report
+
+        overall = report["overall"]
+        print(f"{game_type}: {overall['predictions']} predictions over {len(report['folds'])} folds "
+              f"in {time.perf_counter() - started:.1f}s")
+        if overall["predictions"]:
+            safe_accuracy = overall["safe_accuracy"]
+            print(f"  accuracy {overall['accuracy']:.3f}, safe coverage {overall['safe_coverage']:.3f}, "
+                  f"safe accuracy {'n/a' if safe_accuracy is None else f'{safe_accuracy:.3f}'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import numpy as np
+
+class CompiledForest:
+    """A trained random forest flattened into contiguous arrays, evaluated in one vectorized pass"""
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth):
+        self.feature = feature      # Split feature per node (0 at leaves)
+        self.threshold = threshold  # Split threshold per node
+        self.left = left            # Absolute index of the left child, -1 at leaves
+        self.right = right
+        self.value = value          # Class probabilities per node (rows sum to 1 at leaves)
+        self.roots = roots          # Root node index of each tree
+        self.classes_ = classes
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted RandomForestClassifier"""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, -1, tree.children_left + offset))
+            rights.append(np.where(is_leaf, -1, tree.children_right + offset))
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+
+        return cls(
+            np.concatenate(features).astype(np.int32),
+            np.concatenate(thresholds).astype(np.float64),
+            np.concatenate(lefts).astype(np.int32),
+            np.concatenate(rights).astype(np.int32),
+            np.concatenate(values).astype(np.float64),
+            np.asarray(roots, dtype=np.int32),
+            np.asarray(model.classes_),
+            int(max_depth)
+        )
+
+    def leaves(self, X):
+        """Leaf node reached in every tree, shape (rows, trees)"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            if not (left != -1).any():
+                break  # Every tree has reached a leaf
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(left == -1, nodes, np.where(go_left, left, self.right[nodes]))
+        return nodes
+
+    def predict_proba(self, X):
+        # Summing over trees in order, then dividing, mirrors sklearn's accumulation
+        return self.value[self.leaves(X)].sum(axis=1) / len(self.roots)
+
+    def predict_with_proba(self, X):
+        """Predicted classes and class probabilities from a single traversal"""
+        proba = self.predict_proba(X)
+        return self.classes_[np.argmax(proba, axis=1)], proba
+
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
+
+    def matches(self, model, X):
+        """Parity check against the sklearn forest it was compiled from"""
+        X = np.asarray(X, dtype=float)
+        expected = model.predict_proba(X)
+        classes, proba = self.predict_with_proba(X)
+        return np.allclose(proba, expected, rtol=0, atol=1e-12) and np.array_equal(classes, model.predict(X))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                feature=self.feature, threshold=self.threshold, left=self.left, right=self.right,
+                value=self.value, roots=self.roots, classes=self.classes_,
+                max_depth=np.asarray(self.max_depth)
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['feature'], data['threshold'], data['left'], data['right'],
+                data['value'], data['roots'], data['classes'], int(data['max_depth'])
+            )
@@ -1,120 +1,178 @@
 import pandas as pd
 import numpy as np
 
+# Fixed color encoding shared by training and inference; unknown colors encode as -1
+COLOR_MAP = {'RED': 0, 'GREEN': 1, 'VIOLET': 2}
+COLOR_NAMES = {code: color for color, code in COLOR_MAP.items()}
+COLORS = list(COLOR_MAP)
+
+class FeatureSpec:
+    """One feature: how to compute it over a whole history and from the online state"""
+
+    def __init__(self, name, window, dtype, batch, online):
+        self.name = name
+        self.window = window  # Trailing draws needed, including the current one
+        self.dtype = dtype
+        self.batch = batch    # batch(draws: DrawArrays) -> array with one value per draw
+        self.online = online  # online(state: OnlineFeatureState) -> value for the latest draw
+
+class DrawArrays:
+    """Chronological columns of a history, as consumed by FeatureSpec.batch"""
+
+    def __init__(self, issues, numbers, colors):
+        self.issues = np.asarray(issues, dtype=str)
+        self.numbers = np.asarray(numbers, dtype=float)
+        self.colors = np.asarray(colors, dtype=object)
+        self.codes = encode_colors(self.colors)
+
+    @classmethod
+    def from_history(cls, history_data):
+        """Sort API-shaped records by issue number and split them into columns"""
+        df = pd.DataFrame(history_data, columns=['issueNumber', 'number', 'color'])  # Columns survive an empty history
+        df = df.sort_values('issueNumber').reset_index(drop=True)
+        numbers = pd.to_numeric(df['number'], errors='coerce')
+        return cls(df['issueNumber'].astype(str), numbers, df['color'])
+
+    def __len__(self):
+        return len(self.numbers)
+
+def encode_colors(colors):
+    codes = np.full(len(colors), -1, dtype=np.int64)
+    for color, code in COLOR_MAP.items():
+        codes[np.asarray(colors) == color] = code
+    return codes
+
+def shift(values, periods, fill):
+    shifted = np.full(len(values), fill, dtype=np.result_type(values, type(fill)))
+    shifted[periods:] = values[:-periods]
+    return shifted
+
+def rolling_mean(values, window):
+    return pd.Series(values).rolling(window=window).mean().to_numpy()
+
+def _prev_color(i):
+    return FeatureSpec(f'prev_color_{i}', i + 1, 'int64',
+                       lambda d: shift(d.codes, i, -1),
+                       lambda s: s.codes[-1 - i])
+
+def _prev_number(i):
+    return FeatureSpec(f'prev_number_{i}', i + 1, 'float64',
+                       lambda d: shift(d.numbers, i, np.nan),
+                       lambda s: s.numbers[-1 - i])
+
+def _streak(color):
+    return FeatureSpec(f'streak_{color.lower()}', 1, 'int64',
+                       lambda d: calculate_streak(d.colors, color),
+                       lambda s: s.color_streaks[color])
+
+def _frequency(color):
+    return FeatureSpec(f'freq_{color}_last10', 10, 'float64',
+                       lambda d: rolling_count(d.colors, color, 10),
+                       lambda s: float(s.color_counts[color]))
+
+def _delta(i):
+    return FeatureSpec(f'delta_{i}', i + 1, 'float64',
+                       lambda d: d.numbers - shift(d.numbers, i, np.nan),
+                       lambda s: s.numbers[-1] - s.numbers[-1 - i])
+
+# The feature registry: column order of every feature matrix, for training and inference alike
+FEATURES = (
+    [
+        FeatureSpec('number', 1, 'float64', lambda d: d.numbers, lambda s: s.numbers[-1]),
+        FeatureSpec('color_encoded', 1, 'int64', lambda d: d.codes, lambda s: s.codes[-1]),
+    ]
+    + [spec for i in range(1, 6) for spec in (_prev_color(i), _prev_number(i))]  # Last 5 rounds
+    + [_streak(color) for color in COLORS]
+    + [_frequency(color) for color in COLORS]
+    + [
+        FeatureSpec('is_even', 1, 'int64',
+                    lambda d: (d.numbers % 2 == 0).astype(np.int64),
+                    lambda s: int(s.numbers[-1] % 2 == 0)),
+        FeatureSpec('parity_streak', 1, 'int64',
+                    lambda d: calculate_parity_streak(d.numbers),
+                    lambda s: s.parity_streak),
+        # Big/small features (assuming >50 is big)
+        FeatureSpec('is_big', 1, 'int64',
+                    lambda d: (d.numbers > 50).astype(np.int64),
+                    lambda s: int(s.numbers[-1] > 50)),
+        FeatureSpec('big_streak', 1, 'int64',
+                    lambda d: calculate_big_small_streak(d.numbers, 'big'),
+                    lambda s: s.big_streak),
+        FeatureSpec('ma_5', 5, 'float64', lambda d: rolling_mean(d.numbers, 5), lambda s: s.sum_5 / 5),
+        FeatureSpec('ma_10', 10, 'float64', lambda d: rolling_mean(d.numbers, 10), lambda s: s.sum_10 / 10),
+    ]
+    + [_delta(i) for i in (1, 2)]
+)
+
+FEATURE_COLUMNS = [spec.name for spec in FEATURES]
+FEATURE_WINDOW = max(spec.window for spec in FEATURES)
+
+def build_feature_matrix(draws):
+    """Compile the registry over a DrawArrays: one float row per draw, NaN where a window is not full"""
+    matrix = np.empty((len(draws), len(FEATURES)), dtype=float)
+    for column, spec in enumerate(FEATURES):
+        matrix[:, column] = spec.batch(draws)
+    return matrix
+
+def training_rows(draws, matrix):
+    """Rows usable for training: complete features and a known next color; returns (rows, targets)"""
+    rows = np.flatnonzero(~np.isnan(matrix).any(axis=1))
+    rows = rows[rows < len(draws) - 1]
+    rows = rows[draws.codes[rows + 1] >= 0]
+    return rows, draws.codes[rows + 1]
+
 def build_features(history_data):
     """Build features from historical data"""
-    df = pd.DataFrame(history_data)
-    if df.empty:
+    if not len(history_data):
         return pd.DataFrame()
-        
-    # Sort by issue number to ensure chronological order
-    df = df.sort_values('issueNumber').reset_index(drop=True)
-    
-    # Convert number to numeric if needed
-    df['number'] = pd.to_numeric(df['number'], errors='coerce')
     
-    # Feature engineering
-    features = pd.DataFrame()
-    features['issueNumber'] = df['issueNumber']
-    features['number'] = df['number']
+    draws = DrawArrays.from_history(history_data)
+    matrix = build_feature_matrix(draws)
+    rows, _ = training_rows(draws, matrix)
     
-    # Color features
-    color_map = {'RED': 0, 'GREEN': 1, 'VIOLET': 2}
-    features['color_encoded'] = df['color'].map(color_map)
+    features = pd.DataFrame({'issueNumber': draws.issues[rows]})
+    for column, spec in enumerate(FEATURES):
+        features[spec.name] = matrix[rows, column].astype(spec.dtype)
     
-    # Last N outcomes features
-    for i in range(1, 6):  # Last 5 rounds
-        features[f'prev_color_{i}'] = df['color'].shift(i).map(color_map)
-        features[f'prev_number_{i}'] = df['number'].shift(i)
-    
-    # Streak features
-    features['streak_red'] = calculate_streak(df['color'], 'RED')
-    features['streak_green'] = calculate_streak(df['color'], 'GREEN')
-    features['streak_violet'] = calculate_streak(df['color'], 'VIOLET')
-    
-    # Color frequency in last 10 rounds
-    for color in ['RED', 'GREEN', 'VIOLET']:
-        features[f'freq_{color}_last10'] = df['color'].rolling(window=10).apply(
-            lambda x: (x == color).sum() if len(x) == 10 else np.nan
-        )
-    
-    # Parity features
-    features['is_even'] = (df['number'] % 2 == 0).astype(int)
-    features['parity_streak'] = calculate_parity_streak(df['number'])
-    
-    # Big/small features (assuming >50 is big)
-    features['is_big'] = (df['number'] > 50).astype(int)
-    features['big_streak'] = calculate_big_small_streak(df['number'], 'big')
-    
-    # Moving averages
-    features['ma_5'] = df['number'].rolling(window=5).mean()
-    features['ma_10'] = df['number'].rolling(window=10).mean()
-    
-    # Deltas
-    features['delta_1'] = df['number'].diff(1)
-    features['delta_2'] = df['number'].diff(2)
-    
-    # Drop rows with NaN values
-    features = features.dropna()
-    
-    # Prepare target variable (next color)
-    targets = df['color'].iloc[1:].reset_index(drop=True)
-    features = features.iloc[:-1].reset_index(drop=True)
+    # Target variable: the next draw's color
+    targets = pd.Series(draws.colors[rows + 1])
     
     return features, targets
 
 def calculate_streak(series, color):
     """Calculate consecutive streaks for a specific color"""
-    streaks = []
-    current_streak = 0
-    
-    for val in series:
-        if val == color:
-            current_streak += 1
-        else:
-            current_streak = 0
-        streaks.append(current_streak)
-    
-    return streaks
+    hits = np.asarray(series) == color
+    positions = np.arange(len(hits))
+    # Position of the most recent miss at or before each row
+    last_miss = np.maximum.accumulate(np.where(hits, -1, positions))
+    return np.where(hits, positions - last_miss, 0)
 
 def calculate_parity_streak(numbers):
     """Calculate consecutive parity streaks"""
-    streaks = []
-    current_streak = 0
-    last_parity = None
-    
-    for num in numbers:
-        if pd.isna(num):
-            streaks.append(0)
-            continue
-            
-        parity = 'even' if num % 2 == 0 else 'odd'
-        if parity == last_parity:
-            current_streak += 1
-        else:
-            current_streak = 1
-        last_parity = parity
-        streaks.append(current_streak)
-    
-    return streaks
+    numbers = np.asarray(numbers, dtype=float)
+    return _run_lengths(numbers % 2 == 0, ~np.isnan(numbers))
 
 def calculate_big_small_streak(numbers, category):
     """Calculate big/small streaks"""
-    streaks = []
-    current_streak = 0
-    last_category = None
-    
-    for num in numbers:
-        if pd.isna(num):
-            streaks.append(0)
-            continue
-            
-        cat = 'big' if num > 50 else 'small'
-        if cat == last_category:
-            current_streak += 1
-        else:
-            current_streak = 1
-        last_category = cat
-        streaks.append(current_streak)
-    
-    return streaks
\ No newline at end of file
+    numbers = np.asarray(numbers, dtype=float)
+    return _run_lengths(numbers > 50, ~np.isnan(numbers))
+
+def rolling_count(series, value, window):
+    """Count occurrences of value in each trailing window; NaN until the window is full"""
+    cumulative = np.cumsum(np.asarray(series) == value, dtype=float)
+    counts = np.full(len(cumulative), np.nan)
+    if len(cumulative) >= window:
+        counts[window - 1] = cumulative[window - 1]
+        counts[window:] = cumulative[window:] - cumulative[:-window]
+    return counts
+
+def _run_lengths(categories, valid):
+    """Length of the current run of equal categories; invalid rows are 0 and do not break runs"""
+    streaks = np.zeros(len(categories), dtype=np.int64)
+    values = categories[valid]
+    if len(values):
+        positions = np.arange(len(values))
+        run_start = np.ones(len(values), dtype=bool)
+        run_start[1:] = values[1:] != values[:-1]
+        streaks[valid] = positions - np.maximum.accumulate(np.where(run_start, positions, 0)) + 1
+    return streaks
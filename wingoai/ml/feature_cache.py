@@ -0,0 +1,81 @@
+from .feature_builder import FEATURE_COLUMNS, build_feature_matrix
+from .online_features import OnlineFeatureState
+import joblib
+import numpy as np
+import os
+
+class FeatureCache:
+    """On-disk feature matrix per game type, covering a contiguous issueNumber range"""
+
+    def __init__(self, cache_dir, max_rows=50000):
+        self.cache_dir = cache_dir
+        self.max_rows = max_rows
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, game_type):
+        return os.path.join(self.cache_dir, f'features_{game_type}.joblib')
+
+    def load(self, game_type):
+        try:
+            entry = joblib.load(self.path(game_type))
+        except Exception:
+            return None
+        # A changed feature registry invalidates every cached matrix
+        if entry.get('columns') != FEATURE_COLUMNS:
+            return None
+        return entry
+
+    def save(self, game_type, issues, matrix, state):
+        issues, matrix = issues[-self.max_rows:], matrix[-self.max_rows:]
+        entry = {
+            'columns': FEATURE_COLUMNS,
+            'first_issue': str(issues[0]),
+            'last_issue': str(issues[-1]),
+            'issues': issues,
+            'matrix': matrix,
+            'state': state
+        }
+        tmp_path = self.path(game_type) + '.tmp'
+        joblib.dump(entry, tmp_path)
+        os.replace(tmp_path, self.path(game_type))
+
+    def matrix(self, game_type, draws):
+        """Feature matrix for draws; only draws after the cached range are computed"""
+        if not len(draws):
+            return np.empty((0, len(FEATURE_COLUMNS)))
+
+        entry = self.load(game_type)
+        cached = self._cached_prefix(entry, draws) if entry else None
+        if cached is None:
+            matrix = build_feature_matrix(draws)
+            state = OnlineFeatureState.from_matrix(draws, matrix)
+        else:
+            state = entry['state']
+            rows = [cached]
+            for i in range(len(cached), len(draws)):
+                state.update({'issueNumber': draws.issues[i], 'number': draws.numbers[i], 'color': draws.colors[i]})
+                # Rows without a complete window only matter as "not trainable", so NaN is enough
+                row = state.vector()
+                rows.append(np.array([row if row is not None else [np.nan] * len(FEATURE_COLUMNS)], dtype=float))
+            matrix = np.vstack(rows)
+            if len(cached) == len(draws):
+                return matrix
+            # Keep the cached rows before this window so shorter requests do not shrink the cache
+            kept = len(entry['issues']) - len(cached)
+            self.save(game_type, np.concatenate([entry['issues'][:kept], draws.issues]),
+                      np.vstack([entry['matrix'][:kept], matrix]), state)
+            return matrix
+
+        self.save(game_type, draws.issues, matrix, state)
+        return matrix
+
+    def _cached_prefix(self, entry, draws):
+        """Cached rows for the leading draws, if draws continue exactly from the cached range"""
+        issues = entry['issues']
+        start = int(np.searchsorted(issues, draws.issues[0]))
+        overlap = len(issues) - start
+        if overlap <= 0 or overlap > len(draws):
+            return None
+        if not np.array_equal(issues[start:], draws.issues[:overlap]):
+            return None
+        return entry['matrix'][start:]
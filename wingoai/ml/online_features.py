@@ -0,0 +1,115 @@
+from collections import deque
+from .feature_builder import COLORS, COLOR_MAP, FEATURES, FEATURE_COLUMNS, FEATURE_WINDOW
+import math
+import numpy as np
+
+class OnlineFeatureState:
+    """Constant-time feature state for one game type, updated one draw at a time"""
+
+    WINDOW = FEATURE_WINDOW
+
+    def __init__(self):
+        self.last_issue = None
+        self.numbers = deque(maxlen=self.WINDOW)  # Newest last
+        self.colors = deque(maxlen=self.WINDOW)
+        self.codes = deque(maxlen=self.WINDOW)
+        self.color_counts = {color: 0 for color in COLORS}
+        self.color_streaks = {color: 0 for color in COLORS}
+        self.sum_5 = 0.0
+        self.sum_10 = 0.0
+        self.nan_5 = 0
+        self.nan_10 = 0
+        self.last_parity = None
+        self.parity_streak = 0
+        self.last_big = None
+        self.big_streak = 0
+
+    @classmethod
+    def from_matrix(cls, draws, matrix):
+        """State after the last draw of a batch-built matrix, without replaying the whole history"""
+        state = cls()
+        for i in range(max(0, len(draws) - cls.WINDOW), len(draws)):
+            state.update({'issueNumber': draws.issues[i], 'number': draws.numbers[i], 'color': draws.colors[i]})
+
+        # Streaks can be longer than the window; take them from the matrix instead
+        column = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+        if len(draws):
+            for color in COLORS:
+                state.color_streaks[color] = int(matrix[-1, column[f'streak_{color.lower()}']])
+        valid = np.flatnonzero(~np.isnan(draws.numbers))
+        if len(valid):
+            last = valid[-1]
+            state.parity_streak = int(matrix[last, column['parity_streak']])
+            state.last_parity = draws.numbers[last] % 2 == 0
+            state.big_streak = int(matrix[last, column['big_streak']])
+            state.last_big = draws.numbers[last] > 50
+        return state
+
+    def update(self, draw):
+        """Fold one draw (API record shape) into the state; older or repeated issues are ignored"""
+        issue = str(draw['issueNumber'])
+        if self.last_issue is not None and issue <= self.last_issue:
+            return False
+        self.last_issue = issue
+
+        try:
+            number = float(draw['number'])
+        except (TypeError, ValueError):
+            number = math.nan
+        color = draw.get('color')
+
+        # Window sums: drop what falls out of the 5 and 10 windows, then add the new value
+        if len(self.numbers) == self.WINDOW:
+            self._window_remove(self.numbers[0], 10)
+            self._window_color_remove(self.colors[0])
+        if len(self.numbers) >= 5:
+            self._window_remove(self.numbers[-5], 5)
+        self.numbers.append(number)
+        self.colors.append(color)
+        self._window_add(number)
+        if color in self.color_counts:
+            self.color_counts[color] += 1
+
+        self.codes.append(COLOR_MAP.get(color, -1))
+        for name in COLORS:
+            self.color_streaks[name] = self.color_streaks[name] + 1 if color == name else 0
+
+        if not math.isnan(number):
+            parity = number % 2 == 0
+            self.parity_streak = self.parity_streak + 1 if parity == self.last_parity else 1
+            self.last_parity = parity
+
+            big = number > 50
+            self.big_streak = self.big_streak + 1 if big == self.last_big else 1
+            self.last_big = big
+        return True
+
+    def _window_add(self, number):
+        if math.isnan(number):
+            self.nan_5 += 1
+            self.nan_10 += 1
+        else:
+            self.sum_5 += number
+            self.sum_10 += number
+
+    def _window_remove(self, number, window):
+        if window == 5:
+            if math.isnan(number):
+                self.nan_5 -= 1
+            else:
+                self.sum_5 -= number
+        else:
+            if math.isnan(number):
+                self.nan_10 -= 1
+            else:
+                self.sum_10 -= number
+
+    def _window_color_remove(self, color):
+        if color in self.color_counts:
+            self.color_counts[color] -= 1
+
+    def vector(self):
+        """Feature row for the latest draw (predicting the next one), or None if not ready"""
+        if len(self.numbers) < self.WINDOW or self.nan_10:
+            return None
+        return [spec.online(self) for spec in FEATURES]
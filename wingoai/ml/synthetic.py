@@ -0,0 +1,58 @@
+import random
+import numpy as np
+from datetime import datetime, timedelta
+
+# Issue number layout: YYYYMMDD + game code + 4-digit period of the day
+ISSUE_GAME_CODES = {
+    'WinGo_30S': '10005',
+    'WinGo_1M': '10001',
+    'WinGo_3M': '10002',
+    'WinGo_5M': '10003'
+}
+
+SYNTHETIC_EPOCH = datetime(2024, 1, 1)
+
+def number_color(number):
+    """Map a drawn number to the color vocabulary used by the feature builders"""
+    if number in (0, 5):
+        return 'VIOLET'
+    return 'GREEN' if number % 2 else 'RED'
+
+def issue_number(endpoint, interval_seconds, index, epoch=SYNTHETIC_EPOCH):
+    """Issue number of the index-th period after epoch"""
+    start = epoch + timedelta(seconds=index * interval_seconds)
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    period = int((start - midnight).total_seconds()) // interval_seconds + 1
+    return f"{start:%Y%m%d}{ISSUE_GAME_CODES.get(endpoint, '10000')}{period:04d}"
+
+def synthetic_draw(endpoint, interval_seconds, index, seed=0):
+    """Deterministic draw for a period index, so any slice can be generated lazily"""
+    rng = random.Random(f"{seed}:{endpoint}:{index}")
+    number = rng.randint(0, 9)
+    return {
+        "issueNumber": issue_number(endpoint, interval_seconds, index),
+        "number": str(number),
+        "color": number_color(number)
+    }
+
+def generate_draws(count, endpoint='WinGo_1M', interval_seconds=60, seed=0, start_index=0):
+    """Generate count draws in the draw API's record shape, newest first"""
+    return [
+        synthetic_draw(endpoint, interval_seconds, index, seed)
+        for index in range(start_index + count - 1, start_index - 1, -1)
+    ]
+
+def generate_draws_fast(count, endpoint='WinGo_1M', interval_seconds=60, seed=0):
+    """Vectorized generate_draws for benchmark-sized histories; same record shape, different numbers"""
+    numbers = np.random.default_rng(seed).integers(0, 10, count)[::-1]
+    seconds = np.arange(count - 1, -1, -1, dtype=np.int64) * interval_seconds
+    days, periods = np.divmod(seconds, 86400)
+    periods = periods // interval_seconds + 1
+
+    code = ISSUE_GAME_CODES.get(endpoint, '10000')
+    prefixes = {day: f"{SYNTHETIC_EPOCH + timedelta(days=day):%Y%m%d}{code}" for day in set(days.tolist())}
+    colors = [number_color(n) for n in range(10)]
+    return [
+        {"issueNumber": f"{prefixes[day]}{period:04d}", "number": str(number), "color": colors[number]}
+        for day, period, number in zip(days.tolist(), periods.tolist(), numbers.tolist())
+    ]
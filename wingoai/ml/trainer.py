@@ -1,25 +1,70 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import os
 import sys
-from ml_engine import MLEngine, GAME_TYPE_CONFIG
+import time
 
-def train_all_models():
-    """Train all ML models for all game types"""
-    ml_engine = MLEngine()
-    success_count = 0
-    total_games = len(GAME_TYPE_CONFIG)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database import init_db
+from backend.ingestion import IngestionService
+from backend.ml_engine import MLEngine, GAME_TYPE_CONFIG
+
+# Total cores a retrain may use; the rest stay free for prediction ticks
+TRAIN_CPU_LIMIT = int(os.getenv("TRAIN_CPU_LIMIT", str(max(1, (os.cpu_count() or 2) // 2))))
+
+def train_one(game_type, n_jobs):
+    """Run one game type's load→features→fit→save pipeline; executed in a worker process"""
+    started = time.perf_counter()
+    ml_engine = MLEngine(n_jobs=n_jobs)
+    success = ml_engine.train_model(game_type)
+    return {
+        "success": success,
+        "seconds": time.perf_counter() - started,
+        "stages": ml_engine.training_timings.get(game_type, {})
+    }
+
+def train_all_models(game_types=None, cpu_limit=TRAIN_CPU_LIMIT):
+    """Train all ML models for all game types in parallel; returns per-game results"""
+    game_types = list(game_types or GAME_TYPE_CONFIG.keys())
+    cpu_limit = max(1, cpu_limit)
+    # Split the CPU budget: one process per game type, the remaining cores to tree building
+    workers = min(len(game_types), cpu_limit)
+    n_jobs = max(1, cpu_limit // workers)
+    total_games = len(game_types)
+    
+    print(f"Training models for all game types ({workers} processes x {n_jobs} cores)...")
     
-    print("Training models for all game types...")
+    results = {}
+    started = time.perf_counter()
+    # spawn, not fork: the parent may be running scheduler and server threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {game_type: executor.submit(train_one, game_type, n_jobs) for game_type in game_types}
+        for game_type, future in futures.items():
+            try:
+                results[game_type] = future.result()
+            except Exception as e:
+                print(f"Error training {game_type} model: {e}")
+                results[game_type] = {"success": False, "seconds": None, "stages": {}}
     
-    for game_type in GAME_TYPE_CONFIG.keys():
-        print(f"\nTraining {game_type} model...")
-        success = ml_engine.train_model(game_type)
-        if success:
-            print(f"✅ {game_type} model trained successfully!")
-            success_count += 1
+    for game_type, result in results.items():
+        stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["stages"].items())
+        if result["success"]:
+            print(f"✅ {game_type} model trained successfully in {result['seconds']:.2f}s ({stages})")
         else:
             print(f"❌ {game_type} model training failed!")
     
-    print(f"\nTraining complete: {success_count}/{total_games} models trained successfully!")
+    success_count = sum(1 for result in results.values() if result["success"])
+    print(f"\nTraining complete: {success_count}/{total_games} models trained successfully "
+          f"in {time.perf_counter() - started:.2f}s!")
+    return results
+
+def main():
+    init_db()
+    # Bring the local draw store up to date once; training itself only reads the store
+    IngestionService().bootstrap()
+    train_all_models()
 
 if __name__ == "__main__":
-    train_all_models()
\ No newline at end of file
+    main()
@@ -0,0 +1,135 @@
+"""Per-game-type hyperparameter search with time-ordered cross-validation.
+
+    python -m ml.tuner --game-type 30sec --candidates 24 --folds 4
+
+The winning settings are written to ml/models/hyperparams_{game_type}.json, which
+MLEngine.build_model picks up on the next training run.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ml_engine import MLEngine, GAME_TYPE_CONFIG, DEFAULT_MODEL_PARAMS, MAX_TRAINING_RECORDS
+from ml.backtest import _init_worker, fold_arrays, walk_forward_folds
+from ml.feature_builder import DrawArrays, build_feature_matrix, training_rows
+from ml.trainer import TRAIN_CPU_LIMIT
+
+PARAM_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [None, 8, 16],
+    "min_samples_leaf": [1, 5, 20],
+    "max_features": ["sqrt", 0.5]
+}
+
+# Fraction of candidates kept after each fold; the rest are dropped early
+KEEP_FRACTION = 0.5
+
+def candidate_params(count, seed=42):
+    """The defaults plus up to `count - 1` distinct grid points, sampled reproducibly"""
+    grid = [dict(zip(PARAM_GRID, values)) for values in itertools.product(*PARAM_GRID.values())]
+    random.Random(seed).shuffle(grid)
+    candidates = [dict(DEFAULT_MODEL_PARAMS)]
+    default = RandomForestClassifier(**DEFAULT_MODEL_PARAMS).get_params()
+    for params in grid:
+        if len(candidates) >= count:
+            break
+        params["random_state"] = DEFAULT_MODEL_PARAMS["random_state"]
+        if RandomForestClassifier(**params).get_params() != default:
+            candidates.append(params)
+    return candidates
+
+def _score(game_type, params, split):
+    X_train, y_train, X_test, y_test = fold_arrays(split)
+    model = MLEngine().build_model(game_type, params)
+    model.fit(X_train, y_train)
+    return model.score(X_test, y_test)
+
+def tune(game_type, history, candidates=24, folds=4, train_size=None, workers=TRAIN_CPU_LIMIT):
+    """Successive halving over walk-forward folds; returns the best params and their mean accuracy"""
+    draws = DrawArrays.from_history(history)
+    matrix = build_feature_matrix(draws)  # Computed once, shared by every candidate and fold
+    rows, y = training_rows(draws, matrix)
+    X = matrix[rows]
+
+    splits = walk_forward_folds(len(rows), folds, train_size)
+    if not splits:
+        return None
+
+    params = candidate_params(candidates)
+    scores = {i: [] for i in range(len(params))}
+    alive = list(scores)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context,
+                             initializer=_init_worker, initargs=(X, y)) as executor:
+        for fold, split in enumerate(splits):
+            futures = {i: executor.submit(_score, game_type, params[i], split) for i in alive}
+            for i, future in futures.items():
+                scores[i].append(future.result())
+
+            alive.sort(key=lambda i: np.mean(scores[i]), reverse=True)
+            if fold < len(splits) - 1:
+                alive = alive[:max(1, math.ceil(len(alive) * KEEP_FRACTION))]
+                if 0 not in alive:
+                    alive.append(0)  # The defaults run every fold, so the winner is always compared with them
+            print(f"{game_type} fold {fold + 1}/{len(splits)}: best mean accuracy "
+                  f"{np.mean(scores[alive[0]]):.4f}, {len(alive)} candidates left")
+
+    best = alive[0]
+    return {
+        "params": params[best],
+        "cv_accuracy": float(np.mean(scores[best])),
+        "default_cv_accuracy": float(np.mean(scores[0])),
+        "folds": len(splits),
+        "rows": int(len(rows)),
+        "tuned_at": datetime.utcnow().isoformat()
+    }
+
+def save_result(ml_engine, game_type, result):
+    path = ml_engine.hyperparams_path(game_type)
+    with open(path + ".tmp", "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--game-type", choices=list(GAME_TYPE_CONFIG), action="append",
+                        help="Game type to tune (repeatable; default: all)")
+    parser.add_argument("--candidates", type=int, default=24, help="Parameter sets to try, including the defaults")
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--train-size", type=int, help="Rolling training window in rows (default: expanding)")
+    parser.add_argument("--limit", type=int, default=MAX_TRAINING_RECORDS, help="Most recent stored draws to use")
+    parser.add_argument("--workers", type=int, default=TRAIN_CPU_LIMIT)
+    parser.add_argument("--dry-run", action="store_true", help="Report the winner without saving it")
+    args = parser.parse_args()
+
+    ml_engine = MLEngine()
+    for game_type in args.game_type or GAME_TYPE_CONFIG.keys():
+        started = time.perf_counter()
+        history = ml_engine.fetch_history(game_type, limit=args.limit)
+        result = tune(game_type, history, args.candidates, args.folds, args.train_size, args.workers)
+        if result is None:
+            print(f"Not enough {game_type} data to tune")
+            continue
+
+        print(f"✅ {game_type}: {result['params']} (cv accuracy {result['cv_accuracy']:.4f}) "
+              f"in {time.perf_counter() - started:.1f}s")
+        if result["cv_accuracy"] <= result["default_cv_accuracy"]:
+            print(f"  no better than the defaults ({result['default_cv_accuracy']:.4f}), not saved")
+        elif not args.dry_run:
+            print(f"Saved to {save_result(ml_engine, game_type, result)}")
+
+if __name__ == "__main__":
+    main()
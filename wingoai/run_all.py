@@ -5,29 +5,34 @@ import threading
 import time
 import signal
 
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
 def run_backend():
-    """Run the FastAPI backend"""
-    os.chdir('backend')
+    """Run the FastAPI backend; it serves reads and relays the worker's broadcasts"""
     print("Starting FastAPI backend...")
-    subprocess.run([sys.executable, '-m', 'uvicorn', 'api:app', '--host', '0.0.0.0', '--port', '8000', '--reload'])
+    env = dict(os.environ, EMBEDDED_SCHEDULER='0')
+    subprocess.run([sys.executable, '-m', 'uvicorn', 'backend.api:app', '--host', '0.0.0.0', '--port', '8000', '--reload'],
+                   cwd=ROOT, env=env)
+
+def run_prediction_worker():
+    """Run the prediction worker (ingestion, predictions, retraining)"""
+    print("Starting Prediction Worker...")
+    subprocess.run([sys.executable, '-m', 'backend.worker'], cwd=ROOT)
 
 def run_user_bot():
     """Run the user bot"""
-    os.chdir('../bots')
     print("Starting User Bot...")
-    subprocess.run([sys.executable, 'user_bot.py'])
+    subprocess.run([sys.executable, 'user_bot.py'], cwd=os.path.join(ROOT, 'bots'))
 
 def run_admin_bot():
     """Run the admin bot"""
-    os.chdir('../bots')
     print("Starting Admin Bot...")
-    subprocess.run([sys.executable, 'admin_bot.py'])
+    subprocess.run([sys.executable, 'admin_bot.py'], cwd=os.path.join(ROOT, 'bots'))
 
 def run_ml_trainer():
     """Run ML model trainer"""
-    os.chdir('../ml')
     print("Starting ML Trainer...")
-    subprocess.run([sys.executable, 'trainer.py'])
+    subprocess.run([sys.executable, '-m', 'ml.trainer'], cwd=ROOT)
 
 def signal_handler(signum, frame):
     print("\nShutting down all services...")
@@ -49,6 +54,10 @@ def main():
     
     time.sleep(3)  # Wait for backend to start
     
+    # The single producer of predictions; the backend relays what it publishes
+    worker_thread = threading.Thread(target=run_prediction_worker, daemon=True)
+    worker_thread.start()
+    
     # Start bots in separate threads
     user_bot_thread = threading.Thread(target=run_user_bot, daemon=True)
     admin_bot_thread = threading.Thread(target=run_admin_bot, daemon=True)
@@ -68,6 +77,7 @@ def main():
     print("WebApp: http://localhost:8000/webapp/index.html")
     print("User Bot: Running (Telegram)")
     print("Admin Bot: Running (Telegram)")
+    print("Prediction Worker: Running (predictions, daily retraining)")
     print("ML Models: Training on startup and daily")
     print("="*60)
     print("Press Ctrl+C to stop all services")
@@ -0,0 +1,47 @@
+"""CompiledForest must reproduce the sklearn forest it was compiled from, before and after a save/load."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from ml.compiled_forest import CompiledForest
+from ml.feature_builder import DrawArrays, build_feature_matrix, training_rows
+from ml.synthetic import synthetic_draw
+
+@pytest.fixture(scope='module')
+def data():
+    history = [synthetic_draw('WinGo_1M', 60, i) for i in range(600)][::-1]
+    draws = DrawArrays.from_history(history)
+    matrix = build_feature_matrix(draws)
+    rows, y = training_rows(draws, matrix)
+    X = matrix[rows]
+    return X[:400], y[:400], X[400:]
+
+def fit(data, max_depth):
+    X, y, _ = data
+    return RandomForestClassifier(n_estimators=25, max_depth=max_depth, random_state=0).fit(X, y)
+
+@pytest.mark.parametrize('max_depth', [6, None])
+def test_matches_sklearn(data, max_depth):
+    model = fit(data, max_depth)
+    compiled = CompiledForest.from_sklearn(model)
+    _, _, X_test = data
+
+    np.testing.assert_array_equal(compiled.predict_proba(X_test), model.predict_proba(X_test))
+    classes, proba = compiled.predict_with_proba(X_test)
+    np.testing.assert_array_equal(classes, model.predict(X_test))
+    np.testing.assert_array_equal(proba, model.predict_proba(X_test))
+    assert compiled.matches(model, X_test)
+
+def test_save_load_round_trip(data, tmp_path):
+    model = fit(data, None)
+    compiled = CompiledForest.from_sklearn(model)
+    path = tmp_path / 'forest.npz'
+    compiled.save(path)
+    loaded = CompiledForest.load(path)
+    _, _, X_test = data
+
+    assert loaded.max_depth == compiled.max_depth
+    np.testing.assert_array_equal(loaded.classes_, model.classes_)
+    classes, proba = loaded.predict_with_proba(X_test)
+    np.testing.assert_array_equal(classes, model.predict(X_test))
+    np.testing.assert_array_equal(proba, model.predict_proba(X_test))
@@ -0,0 +1,131 @@
+"""Vectorized feature builders against the per-row loops they replaced."""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.feature_builder import (
+    build_features, calculate_big_small_streak, calculate_parity_streak,
+    calculate_streak, rolling_count
+)
+
+# Reference implementations: the loops from before vectorization. Colors use the fixed codes that
+# replaced the per-call LabelEncoder, spelled out so a relabelling (which breaks saved models) fails.
+COLOR_CODES = {'RED': 0, 'GREEN': 1, 'VIOLET': 2}
+
+def loop_streak(series, color):
+    streaks = []
+    current_streak = 0
+    for val in series:
+        current_streak = current_streak + 1 if val == color else 0
+        streaks.append(current_streak)
+    return streaks
+
+def loop_category_streak(numbers, category):
+    streaks = []
+    current_streak = 0
+    last_category = None
+    for num in numbers:
+        if pd.isna(num):
+            streaks.append(0)
+            continue
+        cat = category(num)
+        current_streak = current_streak + 1 if cat == last_category else 1
+        last_category = cat
+        streaks.append(current_streak)
+    return streaks
+
+def loop_parity_streak(numbers):
+    return loop_category_streak(numbers, lambda num: 'even' if num % 2 == 0 else 'odd')
+
+def loop_big_small_streak(numbers):
+    return loop_category_streak(numbers, lambda num: 'big' if num > 50 else 'small')
+
+def loop_features(history_data):
+    df = pd.DataFrame(history_data)
+    df = df.sort_values('issueNumber').reset_index(drop=True)
+    df['number'] = pd.to_numeric(df['number'], errors='coerce')
+    encode = lambda color: COLOR_CODES.get(color, -1)
+
+    features = pd.DataFrame()
+    features['issueNumber'] = df['issueNumber']
+    features['number'] = df['number']
+    features['color_encoded'] = df['color'].apply(encode)
+    for i in range(1, 6):
+        features[f'prev_color_{i}'] = df['color'].shift(i).apply(encode)
+        features[f'prev_number_{i}'] = df['number'].shift(i)
+    for color in ['RED', 'GREEN', 'VIOLET']:
+        features[f'streak_{color.lower()}'] = loop_streak(df['color'], color)
+    color_numeric = df['color'].apply(lambda x: {'RED': 1, 'GREEN': 2, 'VIOLET': 3}.get(x, 0))
+    for code, color in enumerate(['RED', 'GREEN', 'VIOLET'], start=1):
+        features[f'freq_{color}_last10'] = color_numeric.rolling(window=10).apply(
+            lambda x: (x == code).sum(), raw=True
+        )
+    features['is_even'] = (df['number'] % 2 == 0).astype(int)
+    features['parity_streak'] = loop_parity_streak(df['number'])
+    features['is_big'] = (df['number'] > 50).astype(int)
+    features['big_streak'] = loop_big_small_streak(df['number'])
+    features['ma_5'] = df['number'].rolling(window=5).mean()
+    features['ma_10'] = df['number'].rolling(window=10).mean()
+    features['delta_1'] = df['number'].diff(1)
+    features['delta_2'] = df['number'].diff(2)
+
+    # Training rows: complete features and a known next color to learn
+    next_color = df['color'].shift(-1)
+    keep = features.notna().all(axis=1) & next_color.isin(list(COLOR_CODES))
+    return features[keep].reset_index(drop=True), next_color[keep].reset_index(drop=True)
+
+def random_history(count, seed):
+    rng = random.Random(seed)
+    history = []
+    for i in range(count):
+        number = rng.choice([str(rng.randint(0, 99))] * 60 + [None, "", "n/a"])  # Some missing
+        color = rng.choice(['RED'] * 5 + ['GREEN'] * 5 + ['VIOLET'] * 2 + ['BLUE', None])  # Some unknown
+        history.append({"issueNumber": f"2026010110001{i:05d}", "number": number, "color": color})
+    rng.shuffle(history)  # Builders must sort by issue themselves
+    return history
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_build_features_matches_loops(seed):
+    history = random_history(2000, seed)
+    expected_features, expected_targets = loop_features(history)
+    features, targets = build_features(history)
+
+    assert len(features) > 100
+    pd.testing.assert_frame_equal(features, expected_features, check_dtype=False)
+    pd.testing.assert_series_equal(targets, expected_targets, check_dtype=False, check_names=False)
+
+def test_prepare_features_matches_loops(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # MLEngine creates its models directory relative to the cwd
+    from backend.ml_engine import MLEngine
+
+    history = random_history(1000, 3)
+    expected_features, expected_targets = loop_features(history)
+    features, targets = MLEngine().prepare_features(history)
+
+    pd.testing.assert_frame_equal(features, expected_features, check_dtype=False)
+    pd.testing.assert_series_equal(targets, expected_targets, check_dtype=False, check_names=False)
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_streak_helpers_match_loops(seed):
+    history = random_history(500, seed)
+    colors = [record["color"] for record in history]
+    numbers = pd.to_numeric(pd.Series([record["number"] for record in history]), errors='coerce')
+
+    for color in ['RED', 'GREEN', 'VIOLET']:
+        np.testing.assert_array_equal(calculate_streak(colors, color), loop_streak(colors, color))
+        expected = pd.Series([c == color for c in colors], dtype=float).rolling(window=10).sum()
+        np.testing.assert_array_equal(rolling_count(colors, color, 10), expected.to_numpy())
+    np.testing.assert_array_equal(calculate_parity_streak(numbers), loop_parity_streak(numbers))
+    np.testing.assert_array_equal(calculate_big_small_streak(numbers, 'big'), loop_big_small_streak(numbers))
+
+def test_build_features_empty_history():
+    assert build_features([]).empty
+
+def test_backtest_empty_history():
+    from ml.backtest import backtest
+
+    report = backtest('1min', [])
+    assert report['rows'] == 0 and report['folds'] == []
+    assert report['overall']['predictions'] == 0
@@ -0,0 +1,57 @@
+"""Live prediction payloads must be JSON-serializable: they are cached, relayed and broadcast as JSON."""
+import json
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from ml.feature_builder import DrawArrays, build_feature_matrix, training_rows
+from ml.synthetic import synthetic_draw
+
+class QueuedRows:
+    """Stands in for the write-behind queue so the test does not need a database"""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, *rows):
+        self.rows.extend(rows)
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Models are stored relative to the cwd
+    from backend.ml_engine import MLEngine
+
+    engine = MLEngine()
+    history = [synthetic_draw('WinGo_1M', 60, i) for i in range(400)][::-1]
+    draws = DrawArrays.from_history(history)
+    matrix = build_feature_matrix(draws)
+    rows, y = training_rows(draws, matrix)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(matrix[rows], y)
+    engine.registry.publish('1min', model, X_check=matrix[rows])
+    return engine, history
+
+def test_predict_next_returns_plain_float(engine):
+    engine, history = engine
+    color, confidence = engine.predict_next('1min', history[:100])
+    assert color in ('RED', 'GREEN', 'VIOLET')
+    assert type(confidence) is float
+
+def test_store_prediction_payload_serializes(engine, monkeypatch):
+    engine, history = engine
+    import backend.scheduler as scheduler_module
+
+    queued = QueuedRows()
+    monkeypatch.setattr(scheduler_module, 'write_behind', queued)
+    scheduler = scheduler_module.PredictionScheduler(None)
+    try:
+        target = '20240101100010401'
+        # numpy scalars, as model outputs and comparisons on them produce
+        payload = scheduler.store_prediction('1min', history, target, 'RED', np.float64(0.91), np.bool_(True))
+    finally:
+        scheduler.executor.shutdown(wait=False)
+
+    decoded = json.loads(json.dumps(payload))
+    assert decoded['period'] == target
+    assert decoded['confidence'] == 0.91 and decoded['safe'] is True
+    assert len(queued.rows) == 1